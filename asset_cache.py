@@ -0,0 +1,192 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+from urllib.parse import urlsplit
+from cache_paths import cache_path
+from request_filter import ALLOW_PATHS
+
+# 只快取後台自己的 JS/CSS；其他網域（CDN、Cloudflare）一律照常走瀏覽器
+CACHE_HOSTS = ("bvshop-manage.bvshop.tw",)
+ASSET_URL_RE = re.compile(
+    r"^https?://(?:" + "|".join(re.escape(h) for h in CACHE_HOSTS) + r")(?::\d+)?/[^?#]+\.(?:js|css)(?:[?#].*)?$",
+    re.IGNORECASE
+)
+# 檔名帶 hash 或版本號、或有查詢字串的視為帶版本，內容不會變，可以一直沿用
+VERSIONED_RE = re.compile(r"[.\-_@/](?:[0-9a-f]{8,}|\d+\.\d+(?:\.\d+)?)(?=[./\-_]|$)", re.IGNORECASE)
+UNVERSIONED_TTL = 12 * 3600  # 秒，沒帶版本的資源過期後重新下載
+KEEP_HEADERS = ("content-type", "access-control-allow-origin", "timing-allow-origin")
+MAX_CACHE_BYTES = 200 * 1024 * 1024  # 超過就從最舊的項目開始淘汰
+
+def is_versioned(url):
+    parts = urlsplit(url)
+    return bool(parts.query) or bool(VERSIONED_RE.search(parts.path))
+
+# 後台 JS/CSS（含 TinyMCE）的本機快取：index 記錄 URL -> 內容 sha256，
+# 內容依 hash 存檔，同樣內容不同 URL 只存一份。各程序共用同一個資料夾。
+# 沒命中時請求照常交給瀏覽器（Cloudflare 的 cookie/驗證都在瀏覽器裡），
+# 再從瀏覽器收到的 200 回應存檔；命中時只回放存下來的 200 內容。
+class AssetCache:
+    def __init__(self, cache_dir=None, log_func=None):
+        self.cache_dir = cache_dir or os.path.dirname(cache_path("assets", "index.json"))
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.log_func = log_func or (lambda msg: print(msg, file=sys.stderr, flush=True))
+        self.index = self._load_index()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_from_disk = 0
+        self._dirty = {}
+        self._missed = set()  # 這次沒命中、等瀏覽器回應後存檔的 URL
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def _cacheable(self, request):
+        if request.method != "GET":
+            return False
+        parts = urlsplit(request.url)
+        if (parts.hostname or "").lower() not in CACHE_HOSTS:
+            return False
+        return not any(parts.path.startswith(p) for p in ALLOW_PATHS)  # Cloudflare 的腳本每次都要拿新的
+
+    def lookup(self, url):
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        if not is_versioned(url) and time.time() - entry["fetched"] > UNVERSIONED_TTL:
+            return None
+        try:
+            with open(self._blob_path(entry["sha256"]), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        return entry, body
+
+    def store(self, url, headers, body):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        entry = {
+            "sha256": digest,
+            "size": len(body),
+            "fetched": time.time(),
+            "headers": {k: v for k, v in headers.items() if k.lower() in KEEP_HEADERS},
+        }
+        self.index[url] = entry
+        self._dirty[url] = entry
+
+    async def install(self, context):
+        # 要在 RequestFilter 之前註冊：Playwright 後註冊的先執行，
+        # 被擋的請求不會進來，沒擋的經 route.fallback 才輪到這裡
+        await context.route(ASSET_URL_RE, self.handle)
+        context.on("response", self._on_response)
+
+    async def handle(self, route):
+        request = route.request
+        if not self._cacheable(request):
+            await route.fallback()
+            return
+        cached = self.lookup(request.url)
+        if cached is not None:
+            entry, body = cached
+            self.hits += 1
+            self.bytes_from_disk += len(body)
+            try:
+                await route.fulfill(status=200, headers=entry["headers"], body=body)
+            except Exception:
+                pass  # 頁面已關閉
+            return
+        self.misses += 1
+        self._missed.add(request.url)
+        try:
+            await route.fallback()
+        except Exception:
+            self._missed.discard(request.url)
+
+    async def _on_response(self, response):
+        # 只存這次沒命中的 URL（命中時 fulfill 的回應也會觸發這個事件）
+        url = response.url
+        if url not in self._missed:
+            return
+        self._missed.discard(url)
+        if response.status != 200:
+            return  # 403、challenge 頁之類的不能當成 JS/CSS 存起來
+        try:
+            body = await response.body()
+        except Exception:
+            return
+        try:
+            self.store(url, response.headers, body)
+        except OSError as e:
+            self.log_func(f"資源快取寫入失敗: {e}")
+
+    def _evict(self, index):
+        # 過期的沒版本資源先丟，總大小超過上限再從最舊的丟；回傳還有被用到的內容 hash
+        now = time.time()
+        kept = {
+            url: entry for url, entry in index.items()
+            if is_versioned(url) or now - entry.get("fetched", 0) <= UNVERSIONED_TTL
+        }
+        sizes = {}
+        for entry in kept.values():
+            sizes[entry["sha256"]] = entry.get("size", 0)
+        total = sum(sizes.values())
+        for url, entry in sorted(kept.items(), key=lambda item: item[1].get("fetched", 0)):
+            if total <= MAX_CACHE_BYTES:
+                break
+            del kept[url]
+            digest = entry["sha256"]
+            if digest in sizes and not any(e["sha256"] == digest for e in kept.values()):
+                total -= sizes.pop(digest)
+        return kept, set(sizes)
+
+    def _remove_unused_blobs(self, used):
+        for sub in os.listdir(self.cache_dir):
+            sub_dir = os.path.join(self.cache_dir, sub)
+            if len(sub) != 2 or not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if name not in used and not name.endswith(".tmp"):
+                    try:
+                        os.remove(os.path.join(sub_dir, name))
+                    except OSError:
+                        pass
+
+    def save(self):
+        # 跟磁碟上的 index 合併後再寫，多個程序同時跑不會互相蓋掉
+        if not self._dirty:
+            return
+        try:
+            merged = self._load_index()
+            merged.update(self._dirty)
+            merged, used = self._evict(merged)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = {}
+            self.index = merged
+            self._remove_unused_blobs(used)
+        except Exception as e:
+            self.log_func(f"儲存資源快取索引失敗: {e}")
+
+    def summary(self):
+        return (
+            f"資源快取：命中 {self.hits} 次、下載 {self.misses} 次，"
+            f"從本機讀取 {self.bytes_from_disk / (1024 * 1024):.1f} MB"
+        )
@@ -0,0 +1,571 @@
+import os
+import sys
+import asyncio
+import random
+from collections import deque
+from up_single import upload_single_product_async, HeadChecker, SESSION_EXPIRED_MSG
+from session_manager import BrowserSessionManager, PagePool, SessionStartError
+from request_filter import RequestFilter
+from asset_cache import AssetCache
+from run_report import RunReport, StageTimer
+from eta_model import EtaEstimator
+from product_record import load_product_record
+from product_scanner import ProductScanner, is_product_dir
+from job_journal import (
+    open_run_journal,
+    QUEUED, STARTED, SAVED, VERIFIED, SKIPPED, FAILED, DONE_STATES
+)
+from image_optimizer import ImageOptimizer, is_available as image_optimizer_available
+from speed_controller import SpeedController, AIMDController, ConcurrencyGate, BehaviorMode
+
+MAX_RETRIES = 5
+RETRY_BACKOFF_BASE = 2.0   # 秒，第 n 次失敗後等 base * 2^(n-1)
+RETRY_BACKOFF_MAX = 30.0
+HEAD_CONCURRENCY = 16  # HEAD 檢查前台的同時連線數（整批共用一個連線池）
+HEAD_PER_HOST = 8
+PAGE_MAX_USES = 20  # 同一個頁面最多連續上架幾個商品就換新的
+PREPARE_AHEAD = 2   # 圖片壓縮最多先做幾倍於目前同時上架數的商品
+
+class EventSignal:
+    # 不依賴 Qt 的簡易 signal：connect 註冊 callback，emit 依序呼叫。
+    # 介面跟 pyqtSignal 一樣，up_single 等模組可以直接拿來 emit。
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, func):
+        self._callbacks.append(func)
+
+    def emit(self, *args):
+        for func in self._callbacks:
+            func(*args)
+
+# 批次上架主流程，不依賴 PyQt；GUI 由 batch_uploader.BVShopBatchUploader 包一層轉成 Qt signal
+class BatchEngine:
+    def __init__(
+        self, src_dir, username, password, max_workers=3, max_pool_size=None,
+        product_domain="https://gd.bvshop.tw", headless=True, only_failed=None,
+        behavior_mode=BehaviorMode.AUTO,
+        speed_status_callback=None,
+        round_status_callback=None,
+        optimize_images=False, image_max_edge=1600, image_format="JPEG",
+        preflight_check=True, verify_only=False, resume=False,
+        product_dirs=None, journal=None, image_processes=None, page_budget=None,
+        block_assets=False, cache_assets=False, report_name=""
+    ):
+        self.product_progress_signal = EventSignal()  # (商品名稱, percent, success, elapsed, log)
+        self.all_done_signal = EventSignal()          # (total, success, fail, fail_list)
+        self.paused_signal = EventSignal()
+        self.resumed_signal = EventSignal()
+        self.pool_size_signal = EventSignal()         # (pool size, history)
+        self.product_found_signal = EventSignal()     # (商品名稱,)
+        self.log_signal = EventSignal()               # (訊息,) 跟單一商品無關的流程訊息
+        self.src_dir = src_dir
+        self.username = username
+        self.password = password
+        self.max_workers = max_workers
+        # AIMD 最多可以長到幾個 worker，預設為設定值的兩倍（上限 16，但不低於設定值）
+        self.max_pool_size = max_pool_size or max(max_workers, min(max_workers * 2, 16))
+        self.product_domain = product_domain
+        self.headless = headless
+        self.only_failed = only_failed
+        self.behavior_mode = behavior_mode
+        self.speed_status_callback = speed_status_callback
+        self.round_status_callback = round_status_callback
+        self.optimize_images = optimize_images
+        self.image_max_edge = image_max_edge
+        self.image_format = image_format
+        # preflight_check: 上架前先檢查前台，已存在的商品直接略過
+        # verify_only: 只檢查前台有哪些商品，不開瀏覽器上架
+        self.preflight_check = preflight_check
+        self.verify_only = verify_only
+        # resume: 依上次的 journal 接續，已完成的商品不再處理
+        self.resume_from_journal = resume
+        # product_dirs: 直接指定要跑的商品資料夾（分片模式），不再掃描 src_dir
+        # journal: 外部提供的 journal（分片模式由主程序統一寫入）
+        self.product_dirs = product_dirs
+        self.journal = journal
+        self.image_processes = image_processes
+        # page_budget: 多個 engine 共用的全域頁面/記憶體上限（多商店同時跑時）
+        self.page_budget = page_budget
+        # report_name: 計時報告檔名後綴，同時跑多個 engine 時分得出是哪一個
+        self.report_name = report_name
+        self._eta = EtaEstimator()
+        self.block_assets = block_assets
+        self.cache_assets = cache_assets
+        self._should_stop = False
+        self._should_pause = False
+        self._pause_event = asyncio.Event()
+        self._pause_event.set()
+
+    def is_product_dir(self, pdir):
+        return is_product_dir(pdir)
+
+    def find_product_dirs(self, src_dir):
+        return ProductScanner(src_dir, only_names=self.only_failed, log_func=self._log).scan()
+
+    def check_product_files(self, pdir):
+        record = load_product_record(pdir)
+        return record.ok, record.error
+
+    def get_slug(self, pdir):
+        return load_product_record(pdir).slug
+
+    def _log(self, msg):
+        if self.log_signal._callbacks:
+            self.log_signal.emit(msg)
+        else:
+            print(msg, file=sys.stderr, flush=True)
+
+    def stop(self):
+        self._should_stop = True
+        self._pause_event.set()  # 防止剛好暫停時 stop 無效
+
+    def _abort(self, reason):
+        if self._abort_reason is None:
+            self._abort_reason = reason
+            self._log(f"中止整批上架：{reason}")
+        self.stop()
+
+    def pause(self):
+        self._should_pause = True
+        self._pause_event.clear()
+        self.paused_signal.emit()
+
+    def resume(self):
+        self._should_pause = False
+        self._pause_event.set()
+        self.resumed_signal.emit()
+
+    def batch_upload(self):
+        asyncio.run(self.batch_upload_async())
+
+    async def batch_upload_async(self):
+        self._pname_to_pdir = {}
+        all_names = self._all_names = []
+        self._success = set()
+        self._final_fail = {}
+        self._last_error = {}
+        self._abort_reason = None
+        self._pending = 0
+        self._scan_done = False
+        self._max_attempt_seen = 1
+        self._retry_handles = []
+        self._all_finished = asyncio.Event()
+        self._queue = asyncio.Queue()
+        self._aimd = AIMDController(self.max_workers, max_size=self.max_pool_size)
+        self._speed_controller = SpeedController(
+            mode=self.behavior_mode, max_workers=self.max_workers, aimd=self._aimd
+        )
+        self._gate = ConcurrencyGate(self._aimd.size)
+        self._speed_controller.add_listener(self._on_speed_changed)
+        self._aimd.add_listener(self._on_pool_changed)
+        self._on_pool_changed()
+        self._request_filter = RequestFilter(log_func=self._log) if self.block_assets else None
+        self._asset_cache = AssetCache(log_func=self._log) if self.cache_assets else None
+        self._session = BrowserSessionManager(
+            self.username, self.password, headless=self.headless, log_func=self._log,
+            request_filter=self._request_filter, asset_cache=self._asset_cache
+        )
+        self._page_pool = PagePool(
+            self._session, max_uses=PAGE_MAX_USES, max_idle=lambda: self._gate.limit, budget=self.page_budget
+        )
+        self._optimizer = None
+        self._prepared = {}
+        self._to_prepare = deque()   # 等著先壓圖的商品（依排入佇列順序）
+        self._prepare_ahead = set()  # 已經開始壓、但 worker 還沒拿到的商品
+        self._skipped = set()
+        self._background_tasks = set()  # 預檢、ETA 特徵等背景 task，留著參照以便停止時取消
+        self._report = RunReport(name=self.report_name)
+        self._head_checker = HeadChecker(
+            self.product_domain, concurrency=HEAD_CONCURRENCY, per_host=HEAD_PER_HOST
+        )
+        if self.optimize_images:
+            if image_optimizer_available():
+                self._optimizer = ImageOptimizer(
+                    max_edge=self.image_max_edge, fmt=self.image_format,
+                    processes=self.image_processes, log_func=self._log
+                )
+            else:
+                self._log("未安裝 Pillow，略過圖片壓縮")
+        if self.journal is not None:
+            resume_states = {}
+            self._journal = self.journal
+        else:
+            self._journal, resume_states = open_run_journal(
+                self.src_dir, self.product_domain, resume=self.resume_from_journal,
+                verify_only=self.verify_only, only_failed=self.only_failed
+            )
+        # 通知初始輪數
+        if self.round_status_callback is not None:
+            self.round_status_callback(1, MAX_RETRIES)
+
+        # worker 開到 AIMD 上限，實際同時上架數由 gate 控制
+        workers = [asyncio.create_task(self._worker()) for _ in range(self._aimd.max_size)]
+        # 續跑：直接從 journal 重建佇列，不必等掃描
+        for pname, entry in resume_states.items():
+            pdir = entry.get("pdir")
+            if not pdir:
+                continue
+            if entry.get("state") in DONE_STATES:
+                self._restore_done(pname, pdir)
+            else:
+                self._enqueue_product(pdir)
+        if self.product_dirs is not None:
+            for pdir in self.product_dirs:
+                self._enqueue_product(pdir)
+            self._scan_done = True
+            if self._pending <= 0:
+                self._all_finished.set()
+        else:
+            # 掃描在背景執行緒跑，找到一個商品就馬上排進佇列（續跑時補上 journal 裡沒有的）
+            loop = asyncio.get_running_loop()
+            scanner = ProductScanner(self.src_dir, only_names=self.only_failed, log_func=self._log)
+            scan_future = loop.run_in_executor(
+                None, scanner.scan,
+                lambda pdir: loop.call_soon_threadsafe(self._enqueue_product, pdir),
+                lambda: self._should_stop
+            )
+            scan_future.add_done_callback(lambda fut: self._on_scan_done(fut))
+        try:
+            # 等全部商品有最終結果，或使用者按下停止
+            while not self._all_finished.is_set() and not self._should_stop:
+                try:
+                    await asyncio.wait_for(self._all_finished.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for handle in self._retry_handles:
+                handle.cancel()
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for fut in list(self._prepared.values()) + list(self._background_tasks):
+                fut.cancel()
+            if self._optimizer is not None:
+                self._optimizer.close()
+            await self._page_pool.close()
+            await self._session.close()
+            if self._request_filter is not None:
+                self._log(self._request_filter.summary())
+            if self._asset_cache is not None:
+                self._log(self._asset_cache.summary())
+
+        # 最後把所有還是失敗的商品一起做 head 檢查，可能其實已經存檔成功
+        if not self.verify_only and not self._should_stop:
+            try:
+                await self._reconcile_failures()
+            except Exception as e:
+                # 只是補救檢查，失敗也要照常送出 all_done
+                self._log(f"失敗商品前台檢查出錯: {e}")
+        await self._head_checker.close()
+        self._write_report()
+        if self.journal is None:
+            self._journal.close()
+
+        fail_list = [(pname, self._final_fail[pname]) for pname in all_names if pname in self._final_fail]
+        if self._should_stop:
+            # 停止時尚未完成的商品也列入失敗清單，方便重跑
+            for pname in all_names:
+                if pname not in self._success and pname not in self._final_fail:
+                    fail_list.append((pname, self._last_error.get(pname, self._abort_reason or "STOP")))
+        self.all_done_signal.emit(len(all_names), len(self._success), len(fail_list), fail_list)
+
+    async def _worker(self):
+        while True:
+            pname, attempt = await self._queue.get()
+            try:
+                await self._pause_event.wait()
+                if self._should_stop:
+                    continue
+                await self._gate.acquire()
+                try:
+                    if self.page_budget is not None:
+                        await self.page_budget.acquire()
+                    try:
+                        await self._process_product(pname, attempt)
+                    finally:
+                        if self.page_budget is not None:
+                            self.page_budget.release()
+                finally:
+                    self._gate.release()
+            except SessionStartError as e:
+                # 登入/瀏覽器重試後仍失敗，每個商品再各試一次也沒用：整批中止，未完成的列入失敗清單
+                self._abort(str(e))
+            except Exception as e:
+                # 開頁面失敗、Target closed 之類的例外跟上架失敗一樣退避重試
+                errmsg = f"Exception: {e}"
+                self.product_progress_signal.emit(pname, 100, False, None, errmsg)
+                self._retry_later(pname, errmsg, attempt)
+            finally:
+                self._queue.task_done()
+
+    async def _process_product(self, pname, attempt):
+        if attempt > self._max_attempt_seen:
+            self._max_attempt_seen = attempt
+            if self.round_status_callback is not None:
+                self.round_status_callback(attempt, MAX_RETRIES)
+        pdir = self._pname_to_pdir[pname]
+
+        # 1. 檢查檔案齊全（解析結果有快取，重試時不用再讀檔；檔案壞掉重試也沒用，直接列為失敗）
+        record = load_product_record(pdir)
+        if not record.ok:
+            self.product_progress_signal.emit(pname, 100, False, 0, record.error)
+            self._finish(pname, False, record.error, FAILED, attempt)
+            return
+        if self._optimizer is not None:
+            if pname not in self._prepared:
+                self._prepared[pname] = asyncio.ensure_future(self._prepare_images(pdir))
+            self._prepare_ahead.discard(pname)
+            self._fill_prepare()
+            try:
+                record = await self._prepared[pname]
+            except Exception:
+                self._prepared.pop(pname, None)  # 重試時重新壓，不要一直拿到同一個失敗結果
+                raise
+
+        # 2. Playwright流程（整批共用同一個瀏覽器與登入狀態）
+        self._journal.record(pname, STARTED, attempt=attempt)
+        context = await self._session.start()
+        seen_generation = self._session.generation
+        page = await self._page_pool.acquire()
+        healthy = False
+        try:
+            pname, ok, msg, cf_encountered = await self._upload_one_product(
+                context, pname, record, self.product_domain, page, attempt
+            )
+            healthy = ok or msg == "STOP"
+        finally:
+            await self._page_pool.release(page, healthy=healthy)
+        # 遇到 challenge 時 upload 流程已即時回報，這裡只記錄沒遇到的情況
+        if not cf_encountered:
+            self._speed_controller.update(False)
+        if ok:
+            self._finish(pname, True, msg, SAVED, attempt)
+            return
+        if self._should_stop:
+            self._last_error[pname] = msg
+            return
+
+        if msg == SESSION_EXPIRED_MSG:
+            try:
+                await self._session.relogin(seen_generation)
+            except Exception as e:
+                self._log(f"重新登入失敗: {e}")
+
+        # 3. 非暫時性錯誤可能其實已經存檔，先用 head 檢查前台
+        if not msg.startswith("RETRY:"):
+            slug = record.slug
+            if slug:
+                exists, status = await self._head_checker.check(
+                    slug, log_func=lambda percent, msg: self._log(f"{pname}: {msg}")
+                )
+                if exists:
+                    self.product_progress_signal.emit(pname, 100, True, 0, f"前台已存在商品，視為成功")
+                    self._finish(pname, True, "前台已存在商品", VERIFIED, attempt)
+                    return
+
+        # 4. 失敗商品馬上排回佇列，不必等整輪結束
+        self._retry_later(pname, msg, attempt)
+
+    def _retry_later(self, pname, msg, attempt):
+        # 退避一段時間後排回佇列；次數用完才列為最終失敗
+        if self._should_stop:
+            self._last_error[pname] = msg
+            return
+        if attempt >= MAX_RETRIES:
+            self._finish(pname, False, msg, FAILED, attempt)
+            return
+        self._last_error[pname] = msg
+        self._journal.record(pname, FAILED, reason=msg, attempt=attempt, retry=True)
+        delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+        self.product_progress_signal.emit(pname, 0, None, None, f"第{attempt}次失敗，{delay:.1f} 秒後重試")
+        loop = asyncio.get_running_loop()
+        self._retry_handles.append(loop.call_later(delay, self._queue.put_nowait, (pname, attempt + 1)))
+
+    async def _reconcile_failures(self):
+        names = [
+            pname for pname in self._final_fail
+            if load_product_record(self._pname_to_pdir[pname]).slug
+        ]
+        if not names:
+            return
+        results = await self._head_checker.check_many(
+            [load_product_record(self._pname_to_pdir[pname]).slug for pname in names],
+            log_func=lambda percent, msg: self._log(msg)
+        )
+        for pname, (exists, status) in zip(names, results):
+            if exists:
+                self.product_progress_signal.emit(pname, 100, True, 0, "前台已存在商品，視為成功")
+                self._final_fail.pop(pname, None)
+                self._success.add(pname)
+                self._journal.record(pname, VERIFIED)
+
+    def _on_speed_changed(self):
+        limit = self._speed_controller.concurrency_limit()
+        if limit:
+            self._gate.set_limit(limit)
+        if self.speed_status_callback is not None:
+            # 及時通知目前速度模式
+            self.speed_status_callback(self._speed_controller.mode_label())
+
+    def _on_pool_changed(self):
+        self._gate.set_limit(self._aimd.size)
+        self.pool_size_signal.emit(self._aimd.size, list(self._aimd.history))
+
+    def _enqueue_product(self, pdir):
+        pname = os.path.basename(pdir)
+        if pname in self._pname_to_pdir:
+            return
+        self._pname_to_pdir[pname] = pdir
+        self._all_names.append(pname)
+        self._pending += 1
+        self._journal.record(pname, QUEUED, pdir=pdir)
+        self.product_found_signal.emit(pname)
+        if self.preflight_check or self.verify_only:
+            self._spawn(self._preflight(pname, pdir))
+        else:
+            self._start_product(pname, pdir)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _preflight(self, pname, pdir):
+        try:
+            record = await asyncio.get_running_loop().run_in_executor(None, load_product_record, pdir)
+            if self._should_stop:
+                return
+            exists = False
+            if record.slug:
+                exists, status = await self._head_checker.check(record.slug, log_func=lambda percent, msg: None)
+        except Exception as e:
+            # 沒處理到的話 _pending 永遠不會歸零，整批會一直等下去
+            errmsg = f"Exception: {e}"
+            self.product_progress_signal.emit(pname, 100, False, 0, errmsg)
+            self._finish(pname, False, errmsg, FAILED)
+            return
+        if exists:
+            self._skipped.add(pname)
+            self.product_progress_signal.emit(pname, 100, True, 0, "前台已存在商品，略過上架")
+            self._finish(pname, True, "前台已存在商品", SKIPPED)
+        elif self.verify_only:
+            reason = "前台不存在" if record.slug else "沒有商品網址 SLUG"
+            self.product_progress_signal.emit(pname, 100, False, 0, reason)
+            self._finish(pname, False, reason, FAILED)
+        else:
+            self._start_product(pname, pdir)
+
+    def _start_product(self, pname, pdir):
+        self._spawn(self._add_eta_product(pname, pdir))
+        if self._optimizer is not None:
+            self._to_prepare.append(pname)
+            self._fill_prepare()
+        self._queue.put_nowait((pname, 1))
+
+    def _fill_prepare(self):
+        # 圖片壓縮在 process pool 先跑，worker 拿到商品時通常已經壓好；
+        # 只先做接下來幾件，掃到上萬件時不會一次把整批排進 process pool
+        limit = max(2, PREPARE_AHEAD * self._gate.limit)
+        while self._to_prepare and len(self._prepare_ahead) < limit:
+            pname = self._to_prepare.popleft()
+            if pname in self._prepared or pname in self._success or pname in self._final_fail:
+                continue
+            self._prepared[pname] = asyncio.ensure_future(self._prepare_images(self._pname_to_pdir[pname]))
+            self._prepare_ahead.add(pname)
+
+    async def _add_eta_product(self, pname, pdir):
+        # 只影響剩餘時間估計，出錯就不算這件，不影響上架
+        try:
+            record = await asyncio.get_running_loop().run_in_executor(None, load_product_record, pdir)
+            if record.ok:
+                self._eta.add_product(pname, record)
+                self._update_eta()
+        except Exception as e:
+            self._log(f"{pname}: 剩餘時間估計略過此商品: {e}")
+
+    def _update_eta(self):
+        self._eta.update(self._gate.active, self._gate.limit)
+
+    def estimate_remaining(self):
+        # 給 GUI 讀的剩餘秒數（任何執行緒都可呼叫）；只檢查前台時不估計
+        if self.verify_only:
+            return None
+        return self._eta.remaining_seconds()
+
+    async def _prepare_images(self, pdir):
+        record = await asyncio.get_running_loop().run_in_executor(None, load_product_record, pdir)
+        if not record.ok:
+            return record
+        return await self._optimizer.optimize_record(record)
+
+    def _on_scan_done(self, fut):
+        # add_done_callback 在 loop 上執行，排在所有 call_soon_threadsafe 之後
+        if not fut.cancelled() and fut.exception() is not None:
+            self._log(f"掃描商品資料夾失敗: {fut.exception()}")
+        self._scan_done = True
+        if self._pending <= 0:
+            self._all_finished.set()
+
+    def _restore_done(self, pname, pdir):
+        if pname in self._pname_to_pdir:
+            return
+        self._pname_to_pdir[pname] = pdir
+        self._all_names.append(pname)
+        self._success.add(pname)
+        self.product_found_signal.emit(pname)
+        self.product_progress_signal.emit(pname, 100, True, 0, "上次已完成，續跑略過")
+
+    def _write_report(self):
+        # 每次上架嘗試的分段計時寫成報告（.bvshop_cache/reports/），摘要表也印到 log
+        if not self._report.records:
+            return
+        try:
+            json_path, _ = self._report.write()
+        except OSError as e:
+            self._log(f"寫入計時報告失敗: {e}")
+            return
+        self._log(self._report.summary_table())
+        self._log(f"計時報告：{json_path}")
+
+    def _finish(self, pname, ok, msg, state, attempt=0):
+        self._journal.record(pname, state, reason="" if ok else msg, attempt=attempt)
+        if ok:
+            self._success.add(pname)
+            self._final_fail.pop(pname, None)
+        else:
+            self._final_fail[pname] = msg
+        self._pending -= 1
+        self._prepared.pop(pname, None)
+        self._prepare_ahead.discard(pname)
+        self._eta.on_finish(pname)
+        self._update_eta()
+        if self._pending <= 0 and self._scan_done:
+            self._all_finished.set()
+
+    async def _upload_one_product(self, context, pname, record, domain, page=None, attempt=1):
+        await self._pause_event.wait()
+        if self._should_stop:
+            return pname, False, "STOP", False
+        percent = 0
+        self.product_progress_signal.emit(pname, percent, None, None, "開始上架")
+        timer = StageTimer()
+        self._eta.on_start(pname)
+        try:
+            ok, msg, cf_encountered = await upload_single_product_async(
+                context, record.info_path, record.output_path, pname, self.product_progress_signal, domain,
+                speed_controller=self._speed_controller, record=record,
+                request_filter=self._request_filter, page=page, stage_timer=timer
+            )
+            percent = 100
+            self.product_progress_signal.emit(pname, percent, ok, None, msg)
+        except Exception as e:
+            percent = 100
+            ok, msg, cf_encountered = False, f"Exception: {e}", False
+            self.product_progress_signal.emit(pname, percent, False, None, msg)
+        total = timer.finish()
+        self._report.add(pname, ok, timer.durations, total, attempt)
+        self._eta.on_result(pname, ok, total)
+        self._update_eta()
+        return pname, ok, msg, cf_encountered
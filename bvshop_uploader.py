@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from batch_engine import BatchEngine
+from sharded_runner import ShardedRunner
+from fanout_scheduler import FanoutScheduler, load_job_spec
+from speed_controller import BehaviorMode
+
+# 不需要 PyQt 的命令列入口，可在 headless Linux 或同時開多個程序跑：
+#   python -m bvshop_uploader run --src 商品資料夾 --workers 4
+#   python -m bvshop_uploader fanout --spec jobs.json
+# 進度以一行一個 JSON 輸出到 stdout。
+
+EXIT_OK = 0            # 全部成功
+EXIT_SOME_FAILED = 1   # 有商品失敗
+EXIT_USAGE = 2         # 參數/設定錯誤
+EXIT_INTERRUPTED = 130 # 被 Ctrl+C 中斷
+
+CONFIG_FILE = "config.json"
+FAILED_LIST_FILE = "failed_list.json"
+VERIFY_MISSING_FILE = "verify_missing.json"
+
+MODES = {"auto": BehaviorMode.AUTO, "speed": BehaviorMode.SPEED, "safe": BehaviorMode.SAFE}
+
+def print_event(event, **fields):
+    entry = {"event": event, "ts": round(time.time(), 3)}
+    entry.update(fields)
+    sys.stdout.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+def load_config(path):
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"載入設定失敗: {e}", file=sys.stderr)
+        return {}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="bvshop_uploader", description="BVShop 批次上架（命令列版）")
+    sub = parser.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="批次上架一個商品資料夾")
+    run.add_argument("--src", required=True, help="商品資料夾")
+    run.add_argument("--username", help="帳號（預設讀 config.json）")
+    run.add_argument("--password", help="密碼（預設讀 config.json，也可用環境變數 BVSHOP_PASSWORD）")
+    run.add_argument("--domain", help="前台主網域（預設讀 config.json）")
+    run.add_argument("--config", default=CONFIG_FILE, help="設定檔路徑")
+    run.add_argument("--workers", type=int, default=3, help="同時上架數（AIMD 起始值）")
+    run.add_argument("--max-workers", type=int, default=None, help="AIMD 最多可以長到幾個 worker")
+    run.add_argument("--processes", type=int, default=1,
+                     help="分成幾個程序上架，每個程序各自一個瀏覽器（--workers 為每個程序的數量）")
+    run.add_argument("--mode", choices=sorted(MODES), default="auto", help="上架速度模式")
+    run.add_argument("--show-browser", action="store_true", help="顯示瀏覽器視窗（預設 headless）")
+    run.add_argument("--only-failed", nargs="?", const=FAILED_LIST_FILE, default=None,
+                     help="只跑失敗清單中的商品（預設讀 failed_list.json）")
+    run.add_argument("--resume", action="store_true", help="依 journal 接續上次")
+    run.add_argument("--verify-only", action="store_true", help="只檢查前台有哪些商品，不上架")
+    run.add_argument("--no-preflight", action="store_true", help="上架前不先檢查前台")
+    run.add_argument("--optimize-images", action="store_true", help="上傳前壓縮圖片（需要 Pillow）")
+    run.add_argument("--max-edge", type=int, default=1600, help="壓縮圖片最長邊")
+    run.add_argument("--block-assets", action="store_true", help="擋掉字型、追蹤碼與外站圖片，加快後台頁面載入")
+    run.add_argument("--no-asset-cache", action="store_true", help="不使用後台 JS/CSS 本機快取")
+    run.add_argument("--quiet", action="store_true", help="只輸出每個商品的最終結果與總結")
+    run.add_argument("--failed-list", default=None,
+                     help="失敗清單輸出路徑（預設 failed_list.json；--verify-only 時預設 verify_missing.json）")
+
+    fanout = sub.add_parser("fanout", help="同一個程序同時上架到多個帳號/商店")
+    fanout.add_argument("--spec", required=True, help="job spec JSON（targets 清單與全域頁面/記憶體上限）")
+    fanout.add_argument("--show-browser", action="store_true", help="顯示瀏覽器視窗（預設 headless）")
+    fanout.add_argument("--no-preflight", action="store_true", help="上架前不先檢查前台")
+    fanout.add_argument("--block-assets", action="store_true", help="擋掉字型、追蹤碼與外站圖片，加快後台頁面載入")
+    fanout.add_argument("--no-asset-cache", action="store_true", help="不使用後台 JS/CSS 本機快取")
+    fanout.add_argument("--resume", action="store_true", help="依 journal 接續上次（各 target 分開記錄）")
+    fanout.add_argument("--quiet", action="store_true", help="只輸出每個商品的最終結果與總結")
+    return parser
+
+def engine_kwargs_from_args(args):
+    config = load_config(args.config)
+    username = args.username or config.get("username", "")
+    password = args.password or os.environ.get("BVSHOP_PASSWORD") or config.get("password", "")
+    domain = (args.domain or config.get("domain", "")).strip()
+    if not username or not password:
+        raise ValueError("缺少帳號或密碼")
+    if not domain:
+        raise ValueError("缺少前台主網域")
+    if not os.path.isdir(args.src):
+        raise ValueError(f"商品資料夾不存在: {args.src}")
+    only_failed = None
+    if args.only_failed:
+        with open(args.only_failed, encoding="utf-8") as f:
+            only_failed = json.load(f)
+    return dict(
+        src_dir=args.src,
+        username=username,
+        password=password,
+        max_workers=max(1, args.workers),
+        max_pool_size=args.max_workers,
+        product_domain=domain,
+        headless=not args.show_browser,
+        only_failed=only_failed,
+        behavior_mode=MODES[args.mode],
+        optimize_images=args.optimize_images,
+        image_max_edge=args.max_edge,
+        block_assets=args.block_assets,
+        cache_assets=not args.no_asset_cache,
+        preflight_check=not args.no_preflight,
+        verify_only=args.verify_only,
+        resume=args.resume,
+    )
+
+def attach_printer(engine, quiet=False, target=None):
+    # target: fanout 模式下每行事件多帶一個 target 欄位，分得出是哪個商店
+    result = {}
+    tag = {"target": target} if target is not None else {}
+
+    def on_progress(pname, percent, success, elapsed, msg):
+        if quiet and success is None:
+            return
+        print_event("progress", product=pname, percent=percent, success=success, message=msg, **tag)
+
+    def on_done(total, success, fail, fail_list):
+        result.update(total=total, success=success, fail=fail, fail_list=fail_list)
+
+    engine.product_progress_signal.connect(on_progress)
+    engine.all_done_signal.connect(on_done)
+    engine.log_signal.connect(lambda msg: print_event("log", message=msg, **tag))
+    engine.pool_size_signal.connect(lambda size, history: print_event("pool_size", size=size, **tag))
+    if not quiet:
+        engine.product_found_signal.connect(lambda pname: print_event("found", product=pname, **tag))
+    return result
+
+def save_failed_list(path, fail_list):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([item[0] for item in fail_list], f, ensure_ascii=False, indent=2)
+
+def cmd_run(args):
+    try:
+        kwargs = engine_kwargs_from_args(args)
+    except (ValueError, OSError) as e:
+        print_event("error", message=str(e))
+        return EXIT_USAGE
+    if args.processes > 1:
+        engine = ShardedRunner(args.processes, **kwargs)
+    else:
+        engine = BatchEngine(**kwargs)
+    result = attach_printer(engine, quiet=args.quiet)
+    started = time.time()
+    try:
+        if args.processes > 1:
+            engine.run()
+        else:
+            asyncio.run(engine.batch_upload_async())
+    except KeyboardInterrupt:
+        engine.stop()
+        print_event("interrupted")
+        return EXIT_INTERRUPTED
+    fail_list = result.get("fail_list", [])
+    # 只檢查前台時寫到另一個檔案，不蓋掉「重跑失敗商品」要用的失敗清單
+    list_path = args.failed_list or (VERIFY_MISSING_FILE if args.verify_only else FAILED_LIST_FILE)
+    save_failed_list(list_path, fail_list)
+    print_event(
+        "summary",
+        total=result.get("total", 0), success=result.get("success", 0), fail=result.get("fail", 0),
+        failed=[item[0] for item in fail_list], elapsed=round(time.time() - started, 1)
+    )
+    return EXIT_OK if not fail_list else EXIT_SOME_FAILED
+
+def cmd_fanout(args):
+    try:
+        spec = load_job_spec(args.spec)
+        for target in spec["targets"]:
+            if not os.path.isdir(target["src_dir"]):
+                raise ValueError(f"商品資料夾不存在: {target['src_dir']}")
+    except (ValueError, OSError) as e:
+        print_event("error", message=str(e))
+        return EXIT_USAGE
+    scheduler = FanoutScheduler(
+        spec, headless=not args.show_browser,
+        engine_kwargs=dict(
+            preflight_check=not args.no_preflight, resume=args.resume, block_assets=args.block_assets,
+            cache_assets=not args.no_asset_cache
+        )
+    )
+    results = {
+        name: attach_printer(engine, quiet=args.quiet, target=name)
+        for name, engine in scheduler.build_engines().items()
+    }
+    started = time.time()
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+        print_event("interrupted")
+        return EXIT_INTERRUPTED
+    all_ok = True
+    for name, result in results.items():
+        fail_list = result.get("fail_list", [])
+        save_failed_list(f"failed_list_{name}.json", fail_list)
+        if fail_list or not result:
+            all_ok = False
+        print_event(
+            "summary", target=name,
+            total=result.get("total", 0), success=result.get("success", 0), fail=result.get("fail", 0),
+            failed=[item[0] for item in fail_list]
+        )
+    print_event("fanout_summary", targets=len(results), elapsed=round(time.time() - started, 1))
+    return EXIT_OK if all_ok else EXIT_SOME_FAILED
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return cmd_run(args)
+    if args.command == "fanout":
+        return cmd_fanout(args)
+    parser.print_help()
+    return EXIT_USAGE
+
+if __name__ == "__main__":
+    sys.exit(main())
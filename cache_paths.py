@@ -0,0 +1,13 @@
+import os
+import hashlib
+
+# 所有自動產生的快取（登入狀態、掃描索引…）都放在這個資料夾
+CACHE_DIR = ".bvshop_cache"
+
+def cache_path(*parts):
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
+
+def short_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
@@ -0,0 +1,154 @@
+import time
+
+# 特徵：常數、主圖數、描述圖數、規格組合數、描述 HTML KB
+FEATURE_NAMES = ("base", "main_images", "desc_images", "spec_combos", "desc_kb")
+# 還沒有量測資料時的預設成本（秒），實際跑幾件後就會被量測值拉過去
+PRIOR_WEIGHTS = (25.0, 1.5, 2.5, 0.8, 0.05)
+PRIOR_STRENGTH = 3.0  # 先驗相當於幾件商品的份量
+
+def product_features(record):
+    info = record.info or {}
+    desc_html = info.get("商品描述HTML", "") or info.get("商品描述_繁體中文_HTML", "") or ""
+    return (
+        1.0,
+        float(len(record.main_images or [])),
+        float(len(record.desc_images or [])),
+        float(len(info.get("規格組合明細") or [])),
+        len(desc_html.encode("utf-8")) / 1024.0,
+    )
+
+def _solve(a, b):
+    # 小型線性方程組（高斯消去 + 部分選主元），不需要 numpy
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        if abs(m[pivot][col]) < 1e-12:
+            return None
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(col + 1, n):
+            f = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= f * m[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+# 單件商品上架成本的線性模型，邊跑邊用實測時間更新（往先驗收斂的 ridge regression）
+class ProductCostModel:
+    def __init__(self, prior=PRIOR_WEIGHTS, prior_strength=PRIOR_STRENGTH):
+        n = len(prior)
+        self.prior = list(prior)
+        self.prior_strength = prior_strength
+        self._xtx = [[0.0] * n for _ in range(n)]
+        self._xty = [0.0] * n
+        self.samples = 0
+        self.weights = list(prior)
+
+    def observe(self, features, seconds):
+        n = len(features)
+        for i in range(n):
+            self._xty[i] += features[i] * seconds
+            for j in range(n):
+                self._xtx[i][j] += features[i] * features[j]
+        self.samples += 1
+        a = [row[:] for row in self._xtx]
+        b = self._xty[:]
+        for i in range(n):
+            a[i][i] += self.prior_strength
+            b[i] += self.prior_strength * self.prior[i]
+        solved = _solve(a, b)
+        if solved is not None:
+            self.weights = solved
+
+    def predict(self, features):
+        # 負值（資料還少時可能出現）至少算基本成本的一成
+        cost = sum(w * x for w, x in zip(self.weights, features))
+        return max(cost, self.prior[0] * 0.1)
+
+    def predict_sum(self, feature_sum, count):
+        # 多件商品的預測總和：線性模型可以直接用特徵總和算，每件仍至少算基本成本的一成
+        cost = sum(w * x for w, x in zip(self.weights, feature_sum))
+        return max(cost, self.prior[0] * 0.1 * count)
+
+# 剩餘時間：尚未完成商品的預測成本總和（進行中的扣掉已花的時間）除以實際同時上架數。
+# 排隊中商品的特徵總和隨加入/開始/完成增減，update() 只需逐一計算進行中的幾件
+class EtaEstimator:
+    ACTIVE_SMOOTHING = 0.2  # 同時上架數的指數平滑係數，避免 AIMD 調整時估計值跳動
+
+    def __init__(self, model=None):
+        self.model = model or ProductCostModel()
+        self._features = {}
+        self._remaining = set()   # 還沒有最終結果的商品
+        self._finished = set()
+        self._started = {}        # 進行中的商品 -> 開始時間
+        self._queued_sum = [0.0] * len(self.model.prior)
+        self._queued_count = 0
+        self._active = None
+        self.last_estimate = None  # (剩餘秒數, 算出時的 monotonic 時間)
+
+    def _add_queued(self, pname, sign):
+        features = self._features[pname]
+        for i, x in enumerate(features):
+            self._queued_sum[i] += sign * x
+        self._queued_count += sign
+
+    def add_product(self, pname, record):
+        # 特徵在背景讀取，商品可能已經有結果了
+        if pname in self._finished or pname in self._features:
+            return
+        self._features[pname] = product_features(record)
+        self._remaining.add(pname)
+        if pname not in self._started:
+            self._add_queued(pname, 1)
+
+    def on_start(self, pname):
+        if pname in self._remaining and pname not in self._started:
+            self._add_queued(pname, -1)
+        self._started[pname] = time.monotonic()
+
+    def on_result(self, pname, ok, seconds):
+        # 每次上架嘗試結束；失敗會排回佇列重試，所以先算回排隊中
+        if self._started.pop(pname, None) is not None and pname in self._remaining:
+            self._add_queued(pname, 1)
+        if ok and pname in self._features:
+            self.model.observe(self._features[pname], seconds)
+
+    def on_finish(self, pname):
+        # 商品有最終結果（成功、放棄或略過）
+        self._finished.add(pname)
+        started = self._started.pop(pname, None)
+        if pname in self._remaining:
+            self._remaining.discard(pname)
+            if started is None:
+                self._add_queued(pname, -1)
+        if not self._remaining:
+            self._queued_sum = [0.0] * len(self._queued_sum)
+            self._queued_count = 0
+
+    def update(self, active, limit):
+        # active：目前實際在上架的數量；limit：目前允許的同時上架數
+        now = time.monotonic()
+        if self._active is None:
+            # 剛開始 worker 還沒全部拿到商品，先以允許的上限為準
+            self._active = float(max(limit, 1))
+        else:
+            self._active += self.ACTIVE_SMOOTHING * (active - self._active)
+        total = 0.0
+        if self._queued_count > 0:
+            total += self.model.predict_sum(self._queued_sum, self._queued_count)
+        for pname, started in self._started.items():
+            features = self._features.get(pname)
+            if features is not None:
+                total += max(self.model.predict(features) - (now - started), 0.0)
+        workers = max(1.0, min(self._active, limit, len(self._remaining) or 1))
+        self.last_estimate = (total / workers, now)
+        return self.last_estimate[0]
+
+    def remaining_seconds(self):
+        # 距離上次更新已過的時間直接扣掉，GUI 每秒讀一次也會平順遞減
+        if self.last_estimate is None:
+            return None
+        seconds, at = self.last_estimate
+        return max(0.0, seconds - (time.monotonic() - at))
@@ -0,0 +1,169 @@
+import json
+import time
+import asyncio
+from batch_engine import BatchEngine
+from speed_controller import BehaviorMode
+
+try:
+    import psutil
+except ImportError:  # 沒有 psutil 時只限制頁面數，不看記憶體
+    psutil = None
+
+MODES = {"auto": BehaviorMode.AUTO, "speed": BehaviorMode.SPEED, "safe": BehaviorMode.SAFE}
+
+# 多個 engine 共用的全域上限：同時開著的頁面數，以及（有 psutil 時）本程序加上
+# 瀏覽器子程序的記憶體。記憶體超過上限時新的商品先等，進行中的不受影響。
+# 各 engine 頁面池裡閒置的頁面也算在頁面數裡，額度不夠時請頁面池關掉閒置頁面。
+class PageBudget:
+    MEMORY_CHECK_INTERVAL = 2.0
+
+    def __init__(self, max_pages, max_memory_mb=None):
+        self.max_pages = max(1, int(max_pages))
+        self.max_memory_mb = max_memory_mb if psutil is not None else None
+        self.active = 0
+        self.idle = 0      # 各頁面池閒置中的頁面數
+        self.waiting = 0   # 正在等額度的商品數
+        self._pools = []
+        self._cond = None  # 在 event loop 裡第一次用到才建立（Python 3.8/3.9 會綁定建立當下的 loop）
+        self._mem_checked_at = 0.0
+        self._mem_mb = 0.0
+
+    def memory_mb(self):
+        now = time.monotonic()
+        if now - self._mem_checked_at >= self.MEMORY_CHECK_INTERVAL:
+            self._mem_checked_at = now
+            try:
+                proc = psutil.Process()
+                total = proc.memory_info().rss
+                for child in proc.children(recursive=True):
+                    try:
+                        total += child.memory_info().rss
+                    except psutil.Error:
+                        continue
+                self._mem_mb = total / (1024 * 1024)
+            except psutil.Error:
+                pass
+        return self._mem_mb
+
+    def _has_room(self):
+        if self.active + self.idle >= self.max_pages:
+            return False
+        # 至少讓一個頁面能跑，避免全部卡死
+        if self.max_memory_mb and self.active > 0 and self.memory_mb() > self.max_memory_mb:
+            return False
+        return True
+
+    def _condition(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            self.waiting += 1
+            try:
+                while not self._has_room():
+                    self._shed_idle()
+                    if self._has_room():
+                        break
+                    try:
+                        await asyncio.wait_for(cond.wait(), timeout=self.MEMORY_CHECK_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting -= 1
+            self.active += 1
+
+    def release(self):
+        self.active -= 1
+        asyncio.ensure_future(self._notify())
+
+    def register_pool(self, pool):
+        self._pools.append(pool)
+
+    def unregister_pool(self, pool):
+        if pool in self._pools:
+            self._pools.remove(pool)
+
+    def add_idle(self, n):
+        self.idle += n
+        if n < 0:
+            asyncio.ensure_future(self._notify())
+
+    def _shed_idle(self):
+        # 頁面數滿了但有閒置頁面：請閒置最多的頁面池關掉一個
+        if self.idle <= 0:
+            return
+        pools = [pool for pool in self._pools if pool.idle_count() > 0]
+        if pools:
+            max(pools, key=lambda pool: pool.idle_count()).shed()
+
+    async def _notify(self):
+        cond = self._condition()
+        async with cond:
+            cond.notify_all()
+
+def load_job_spec(path):
+    # 格式：
+    # {"max_pages": 24, "max_memory_mb": 12000,
+    #  "targets": [{"name": "gd", "username": "...", "password": "...", "domain": "https://gd.bvshop.tw",
+    #               "src_dir": "...", "workers": 3, "max_workers": 6, "mode": "auto"}, ...]}
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    targets = spec.get("targets") or []
+    if not targets:
+        raise ValueError("job spec 沒有 targets")
+    for idx, target in enumerate(targets):
+        for key in ("username", "password", "domain", "src_dir"):
+            if not target.get(key):
+                raise ValueError(f"targets[{idx}] 缺少 {key}")
+        target.setdefault("name", f"target{idx + 1}")
+        if target.get("mode", "auto") not in MODES:
+            raise ValueError(f"targets[{idx}] mode 只能是 {sorted(MODES)}")
+    return spec
+
+# 同一個 event loop 裡同時跑多個 (帳號, 網域, 商品資料夾)，
+# 每個 target 有自己的登入 context 與 AIMD/速度控制，共用一個 PageBudget
+class FanoutScheduler:
+    def __init__(self, spec, headless=True, engine_kwargs=None):
+        self.spec = spec
+        self.headless = headless
+        self.engine_kwargs = engine_kwargs or {}
+        self.page_budget = None
+        self.engines = {}
+
+    def build_engines(self):
+        targets = self.spec["targets"]
+        default_pages = sum(int(t.get("max_workers") or t.get("workers", 3)) for t in targets)
+        self.page_budget = PageBudget(
+            self.spec.get("max_pages") or default_pages, self.spec.get("max_memory_mb")
+        )
+        for target in targets:
+            kwargs = dict(self.engine_kwargs)
+            kwargs.update(
+                src_dir=target["src_dir"],
+                username=target["username"],
+                password=target["password"],
+                max_workers=int(target.get("workers", 3)),
+                max_pool_size=target.get("max_workers"),
+                product_domain=target["domain"].strip(),
+                headless=self.headless,
+                behavior_mode=MODES[target.get("mode", "auto")],
+                page_budget=self.page_budget,
+                report_name=target["name"],
+            )
+            self.engines[target["name"]] = BatchEngine(**kwargs)
+        return self.engines
+
+    def stop(self):
+        for engine in self.engines.values():
+            engine.stop()
+
+    async def run_async(self):
+        if not self.engines:
+            self.build_engines()
+        await asyncio.gather(*(engine.batch_upload_async() for engine in self.engines.values()))
+
+    def run(self):
+        asyncio.run(self.run_async())
@@ -5,16 +5,19 @@ import time
 import psutil
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QFileDialog, QLineEdit, QSpinBox, QGridLayout, QProgressBar, QFrame, QCheckBox, QComboBox, QSizePolicy, QDialog, QTextEdit
+    QFileDialog, QLineEdit, QSpinBox, QProgressBar, QFrame, QCheckBox, QComboBox, QDialog, QPlainTextEdit
 )
 from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QFont, QColor, QPalette, QFontMetrics
+from PyQt5.QtGui import QColor, QPalette
 
 from batch_uploader import BVShopBatchUploader
+from product_list_view import ProductListModel, ProductListView
+from product_log_store import ProductLogStore
 from speed_controller import BehaviorMode
 
 CONFIG_FILE = "config.json"
 FAILED_LIST_FILE = "failed_list.json"
+VERIFY_MISSING_FILE = "verify_missing.json"  # 只檢查前台的結果，不能蓋掉真正的失敗清單
 
 def suggest_max_workers():
     cpu = os.cpu_count() or 2
@@ -24,17 +27,19 @@ def suggest_max_workers():
     return min(max_safe, 16)
 
 class LogDialog(QDialog):
-    def __init__(self, title, log_text, parent=None):
+    # load_func 在對話框第一次顯示時才呼叫（從 log 檔讀完整內容），之後新的行用 append_lines 接上
+    def __init__(self, title, load_func, parent=None):
         super().__init__(parent)
+        self.load_func = load_func
+        self._loaded = False
         self.setWindowTitle(f"{title} - 詳細Log")
         self.resize(900, 600)
         layout = QVBoxLayout(self)
         label = QLabel(title)
         label.setStyleSheet("font-weight:bold;font-size:1.14em;margin-bottom:8px; color:#e5e6ea;")
         layout.addWidget(label)
-        self.log_edit = QTextEdit(self)
+        self.log_edit = QPlainTextEdit(self)
         self.log_edit.setReadOnly(True)
-        self.log_edit.setPlainText(log_text)
         self.log_edit.setStyleSheet("""
             background: #22273a;
             border-radius: 20px;
@@ -62,111 +67,16 @@ class LogDialog(QDialog):
         layout.addWidget(btn, alignment=Qt.AlignRight)
         self.setLayout(layout)
 
-class ProductProgressItem(QWidget):
-    def __init__(self, name, show_log_callback):
-        super().__init__()
-        self.setObjectName("ProductProgressItem")
-        self.show_log_callback = show_log_callback
-        self._log_text = ""
-        layout = QVBoxLayout(self)
-        layout.setSpacing(7)
-        layout.setContentsMargins(30, 12, 30, 12)
-
-        # 商品名稱獨立一行，超長自動省略，最大寬限制
-        self.name_label = QLabel(name, self)
-        self.name_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-        font = QFont("SF Pro Text", 11)
-        font.setWeight(QFont.DemiBold)
-        self.name_label.setFont(font)
-        self.name_label.setStyleSheet("""
-            color:#e5e6ea; margin-bottom: 2px; letter-spacing:0.2px;
-        """)
-        self.name_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self.name_label.setMaximumHeight(28)
-        self.name_label.setMinimumWidth(100)
-        self.name_label.setMaximumWidth(440)
-        self.name_label.setWordWrap(False)
-        self.name_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
-        self.name_label.setToolTip(name)
-        # 手動 elide（...）處理
-        fm = QFontMetrics(self.name_label.font())
-        if fm.width(name) > 420:
-            self.name_label.setText(fm.elidedText(name, Qt.ElideRight, 420))
-        layout.addWidget(self.name_label, stretch=0)
-
-        # 狀態icon與文字一行
-        stat_hbox = QHBoxLayout()
-        stat_hbox.setSpacing(13)
-        self.status_icon = QLabel(self)
-        self.status_icon.setFixedWidth(28)
-        self.status_icon.setAlignment(Qt.AlignCenter)
-        stat_hbox.addWidget(self.status_icon)
-        self.status_label = QLabel("", self)
-        self.status_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-        self.status_label.setStyleSheet("font-size:1.11em; color: #e5e6ea; font-weight: 500;")
-        stat_hbox.addWidget(self.status_label)
-        stat_hbox.addStretch(1)
-        layout.addLayout(stat_hbox, stretch=0)
-
-        # 進度條一整行
-        self.progress_bar = QProgressBar(self)
-        self.progress_bar.setValue(0)
-        self.progress_bar.setFixedHeight(32)
-        self.progress_bar.setStyleSheet("""
-            QProgressBar {
-                border: none;
-                border-radius: 14px;
-                text-align: center;
-                font-weight: 520;
-                background: #1b2230;
-                color: #e5e6ea;
-                font-size: 1.13em;
-            }
-            QProgressBar::chunk {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #69b9ff, stop:1 #7f53ff);
-                border-radius: 14px;
-            }
-        """)
-        self.progress_bar.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        layout.addWidget(self.progress_bar, stretch=0)
-
-        self.progress_bar.mousePressEvent = self.show_log
-        self.mousePressEvent = self.show_log
+    def showEvent(self, event):
+        if not self._loaded:
+            self._loaded = True
+            self.log_edit.setPlainText(self.load_func() or "（暫無Log）")
+        super().showEvent(event)
 
-        self.setStyleSheet("""
-            QWidget#ProductProgressItem {
-                border: 2.2px solid #24304a;
-                border-radius: 32px;
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #232a3d, stop:1 #181c24);
-            }
-            QWidget#ProductProgressItem:hover {
-                border: 2.2px solid #69b9ff;
-                background: #232a3d;
-            }
-        """)
-        self.setLayout(layout)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-
-    def update_progress(self, percent, detail_log):
-        self.progress_bar.setValue(percent)
-        if detail_log:
-            self._log_text += ("\n" if self._log_text else "") + detail_log
-
-    def set_status(self, success, elapsed, detail_log):
-        if success is None:
-            self.status_icon.setText('<span style="font-size:22px; color:#69b9ff;">●</span>')
-            self.status_label.setText("進行中")
-        elif success:
-            self.status_icon.setText('<span style="font-size:22px; color:#66e08c;">✔</span>')
-            self.status_label.setText("成功")
-        else:
-            self.status_icon.setText('<span style="font-size:22px; color:#ff5f5f;">✖</span>')
-            self.status_label.setText("失敗")
-        if detail_log:
-            self._log_text += ("\n" if self._log_text else "") + detail_log
-
-    def show_log(self, event):
-        self.show_log_callback(self.name_label.text(), self._log_text or "（暫無Log）")
+    def append_lines(self, lines):
+        if self._loaded:
+            for line in lines:
+                self.log_edit.appendPlainText(line)
 
 class BVShopMainWindow(QWidget):
     def __init__(self):
@@ -175,13 +85,15 @@ class BVShopMainWindow(QWidget):
         self.resize(1200, 900)  # 可調整大小
         self.bv_batch_uploader = None
         self.product_status = {}
-        self.product_widgets = {}
+        self.log_store = None
+        self.log_dialogs = {}
         self.total_count = 0
         self.success_count = 0
         self.fail_count = 0
         self.start_time = None
         self.is_paused = False
         self.has_started = False
+        self.verify_only = False
         self.init_ui()
         self.load_config()
 
@@ -290,9 +202,39 @@ class BVShopMainWindow(QWidget):
         """)
         lbl4 = QLabel("上架速度模式:")
         lbl4.setStyleSheet(lbl_style)
+        self.optimize_images_checkbox = QCheckBox("上傳前壓縮圖片")
+        self.optimize_images_checkbox.setChecked(False)
+        self.optimize_images_checkbox.setStyleSheet("color:#d1d6e0;font-size:1.12em;")
+        self.image_edge_spin = QSpinBox()
+        self.image_edge_spin.setRange(400, 6000)
+        self.image_edge_spin.setSingleStep(100)
+        self.image_edge_spin.setValue(1600)
+        self.image_edge_spin.setSuffix(" px")
+        self.image_edge_spin.setStyleSheet("""
+            padding:12px 22px; border-radius:15px;
+            background:qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #26324d, stop:1 #1c202a);
+            color:#e5e6ea; border:2px solid #33416a;
+        """)
+        self.preflight_checkbox = QCheckBox("上架前檢查前台")
+        self.preflight_checkbox.setChecked(True)
+        self.preflight_checkbox.setStyleSheet("color:#d1d6e0;font-size:1.12em;")
+        self.block_assets_checkbox = QCheckBox("擋字型/追蹤碼加速載入")
+        self.block_assets_checkbox.setChecked(False)
+        self.block_assets_checkbox.setStyleSheet("color:#d1d6e0;font-size:1.12em;")
+        self.cache_assets_checkbox = QCheckBox("快取後台 JS/CSS")
+        self.cache_assets_checkbox.setChecked(True)
+        self.cache_assets_checkbox.setStyleSheet("color:#d1d6e0;font-size:1.12em;")
+        lbl4b = QLabel("最長邊:")
+        lbl4b.setStyleSheet(lbl_style)
         row4.addWidget(self.headless_checkbox)
         row4.addWidget(lbl4)
         row4.addWidget(self.behavior_mode_combo)
+        row4.addWidget(self.preflight_checkbox)
+        row4.addWidget(self.block_assets_checkbox)
+        row4.addWidget(self.cache_assets_checkbox)
+        row4.addWidget(self.optimize_images_checkbox)
+        row4.addWidget(lbl4b)
+        row4.addWidget(self.image_edge_spin)
         ctl_layout.addLayout(row4)
 
         ctl_wrap.setLayout(ctl_layout)
@@ -302,6 +244,12 @@ class BVShopMainWindow(QWidget):
         self.summary_label.setStyleSheet("font-size: 1.33em; font-weight:600; margin-bottom:14px; color:#e5e6ea;")
         main_layout.addWidget(self.summary_label)
 
+        self.pool_label = QLabel("")
+        self.pool_label.setStyleSheet("font-size: 1.05em; color:#a7c8ff; margin-bottom:6px;")
+        self.pool_label.setWordWrap(True)
+        self.pool_label.setVisible(False)
+        main_layout.addWidget(self.pool_label)
+
         self.overall_progress = QProgressBar()
         self.overall_progress.setMinimum(0)
         self.overall_progress.setMaximum(100)
@@ -329,20 +277,21 @@ class BVShopMainWindow(QWidget):
         self.overall_progress.setVisible(False)
         main_layout.addWidget(self.overall_progress, alignment=Qt.AlignHCenter)
 
-        self.grid_container = QWidget()
-        self.grid_layout = QGridLayout()
-        self.grid_layout.setSpacing(42)
-        self.grid_layout.setContentsMargins(36, 20, 36, 20)
-        self.grid_container.setLayout(self.grid_layout)
-        main_layout.addWidget(self.grid_container, stretch=1)
+        # 進行中/失敗的商品：model + delegate，只畫看得到的卡片
+        self.product_model = ProductListModel(self)
+        self.product_view = ProductListView(self.product_model)
+        self.product_view.clicked.connect(self.on_product_clicked)
+        main_layout.addWidget(self.product_view, stretch=1)
 
         btn_layout = QHBoxLayout()
         self.start_btn = QPushButton("開始批次上架")
         self.pause_resume_btn = QPushButton("暫停")
         self.pause_resume_btn.setEnabled(False)
         self.retry_failed_btn = QPushButton("重跑失敗商品")
+        self.verify_only_btn = QPushButton("只檢查前台")
+        self.resume_btn = QPushButton("接續上次")
         self.exit_btn = QPushButton("結束程式")
-        for btn in [self.start_btn, self.pause_resume_btn, self.retry_failed_btn, self.exit_btn]:
+        for btn in [self.start_btn, self.pause_resume_btn, self.resume_btn, self.retry_failed_btn, self.verify_only_btn, self.exit_btn]:
             btn.setCursor(Qt.PointingHandCursor)
             btn.setStyleSheet("""
                 QPushButton {
@@ -361,13 +310,17 @@ class BVShopMainWindow(QWidget):
             """)
         btn_layout.addWidget(self.start_btn)
         btn_layout.addWidget(self.pause_resume_btn)
+        btn_layout.addWidget(self.resume_btn)
         btn_layout.addWidget(self.retry_failed_btn)
+        btn_layout.addWidget(self.verify_only_btn)
         btn_layout.addWidget(self.exit_btn)
         main_layout.addLayout(btn_layout)
 
         self.setLayout(main_layout)
         self.dir_btn.clicked.connect(self.choose_dir)
-        self.start_btn.clicked.connect(self.start_batch_upload)
+        self.start_btn.clicked.connect(lambda: self.start_batch_upload())
+        self.verify_only_btn.clicked.connect(lambda: self.start_batch_upload(verify_only=True))
+        self.resume_btn.clicked.connect(lambda: self.start_batch_upload(resume=True))
         self.pause_resume_btn.clicked.connect(self.toggle_pause_resume)
         self.retry_failed_btn.clicked.connect(self.retry_failed_uploads)
         self.exit_btn.clicked.connect(self.close)
@@ -420,7 +373,7 @@ class BVShopMainWindow(QWidget):
         else:
             return BehaviorMode.SAFE
 
-    def start_batch_upload(self):
+    def start_batch_upload(self, verify_only=False, resume=False):
         self.save_config()
         src_dir = self.dir_edit.text()
         username = self.username_edit.text()
@@ -435,30 +388,20 @@ class BVShopMainWindow(QWidget):
         if not domain:
             self.summary_label.setText("請輸入主網域")
             return
-        product_dirs = []
-        for name in os.listdir(src_dir):
-            pdir = os.path.join(src_dir, name)
-            if os.path.isdir(pdir) and \
-               os.path.exists(os.path.join(pdir, "product_info.json")) and \
-               os.path.exists(os.path.join(pdir, "product_output.json")):
-                product_dirs.append(pdir)
-        self.total_count = len(product_dirs)
+        # 商品資料夾改由 uploader 在背景掃描，找到一個就透過 product_found_signal 加進來
+        self.verify_only = verify_only
+        self.total_count = 0
         self.success_count = 0
         self.fail_count = 0
         self.start_time = time.time()
         self.product_status.clear()
-        self.clear_widgets()
+        self.log_store = ProductLogStore()
+        self.product_model.clear()
         self.has_started = True
         self.overall_progress.setVisible(True)
         self.pause_resume_btn.setEnabled(True)
         self.pause_resume_btn.setText("暫停")
-        for p in product_dirs:
-            pname = os.path.basename(p)
-            self.product_status[pname] = {
-                "status": "waiting", "progress": 0, "log": "", "widget": None
-            }
         self.update_summary()
-        self.refresh_widgets()
 
         self.bv_batch_uploader = BVShopBatchUploader(
             src_dir=src_dir,
@@ -469,12 +412,22 @@ class BVShopMainWindow(QWidget):
             headless=headless,
             behavior_mode=behavior_mode,
             speed_status_callback=None,
-            round_status_callback=None
+            round_status_callback=None,
+            optimize_images=self.optimize_images_checkbox.isChecked(),
+            image_max_edge=self.image_edge_spin.value(),
+            preflight_check=self.preflight_checkbox.isChecked(),
+            block_assets=self.block_assets_checkbox.isChecked(),
+            cache_assets=self.cache_assets_checkbox.isChecked(),
+            verify_only=verify_only,
+            resume=resume
         )
-        self.bv_batch_uploader.product_progress_signal.connect(self.update_product_progress)
+        self.bv_batch_uploader.product_found_signal.connect(self.add_found_product)
+        self.bv_batch_uploader.progress_batch_signal.connect(self.update_products_batch)
         self.bv_batch_uploader.all_done_signal.connect(self.batch_all_done)
         self.bv_batch_uploader.paused_signal.connect(self.on_paused)
         self.bv_batch_uploader.resumed_signal.connect(self.on_resumed)
+        self.bv_batch_uploader.pool_size_signal.connect(self.update_pool_size)
+        self.bv_batch_uploader.log_signal.connect(self.on_batch_log)
 
         import threading
         def runner():
@@ -484,13 +437,37 @@ class BVShopMainWindow(QWidget):
         self.update_time_estimate()
         self.is_paused = False
 
-    def update_product_progress(self, product_name, percent, success, elapsed, detail_log):
+    def add_found_product(self, product_name):
+        if product_name in self.product_status:
+            return
+        self.product_status[product_name] = {
+            "status": "waiting", "progress": 0
+        }
+        self.total_count += 1
+        self.update_summary()
+
+    def update_products_batch(self, items):
+        # uploader 每 100ms 送來一批彙整過的進度，整批套用後只更新一次總覽
+        for product_name, percent, success, elapsed, lines in items:
+            self.apply_product_progress(product_name, percent, success, elapsed, lines)
+        self.update_summary()
+
+    def apply_product_progress(self, product_name, percent, success, elapsed, lines):
         status = self.product_status.get(product_name)
         if not status:
             return
         status["progress"] = percent
-        if detail_log:
-            status["log"] = (status["log"] + "\n" + detail_log).strip()
+        if lines:
+            self.log_store.append(product_name, lines)
+            dlg = self.log_dialogs.get(product_name)
+            if dlg is not None:
+                dlg.append_lines(lines)
+        # 失敗的商品會被排回佇列重試，計數依狀態轉換增減，避免重複計算
+        prev_status = status["status"]
+        if prev_status == "fail":
+            self.fail_count -= 1
+        elif prev_status == "success":
+            self.success_count -= 1
         if success is None:
             status["status"] = "running"
         elif success:
@@ -501,32 +478,48 @@ class BVShopMainWindow(QWidget):
             self.fail_count += 1
 
         if status["status"] in ["running", "fail"]:
-            if not status.get("widget"):
-                status["widget"] = ProductProgressItem(product_name, self.show_log_dialog)
-                self.product_widgets[product_name] = status["widget"]
-                self.re_layout_grid()
-            status["widget"].update_progress(percent, detail_log)
-            status["widget"].set_status(success, elapsed, detail_log)
+            self.product_model.upsert(product_name, percent, status["status"])
         else:
-            if status.get("widget"):
-                self.remove_widget(product_name)
-                status["widget"] = None
-
-        self.update_summary()
-
-    def show_log_dialog(self, product_name, log_text):
-        dlg = LogDialog(product_name, log_text, self)
-        dlg.exec_()
+            self.product_model.remove(product_name)
+
+    def on_batch_log(self, msg):
+        print(msg, flush=True)
+
+    def update_pool_size(self, size, history):
+        # history: [(timestamp, size, reason), ...]，只顯示最近幾次變化
+        steps = []
+        for ts, n, reason in history[-8:]:
+            steps.append(f"{n}（{time.strftime('%H:%M:%S', time.localtime(ts))} {reason}）")
+        self.pool_label.setText(f"目前同時上架數：{size}　變化：" + " → ".join(steps))
+        self.pool_label.setVisible(True)
+
+    def on_product_clicked(self, index):
+        self.show_log_dialog(self.product_model.name_at(index))
+
+    def show_log_dialog(self, product_name):
+        store = self.log_store
+        dlg = LogDialog(product_name, lambda: store.read_all(product_name) if store else "", self)
+        # 對話框開著時新的 log 直接接到後面
+        self.log_dialogs[product_name] = dlg
+        try:
+            dlg.exec_()
+        finally:
+            self.log_dialogs.pop(product_name, None)
 
     def batch_all_done(self, total, success, fail, fail_list):
         self.estimate_timer.stop()
         elapsed = int(time.time() - self.start_time)
         self.overall_progress.setValue(100)
         self.overall_progress.setFormat("100% 已完成")
-        self.summary_label.setText(
-            f"全部完成：成功 {success}/{total}，失敗 {fail}　總花費 {elapsed // 60}分{elapsed % 60}秒"
-        )
-        self.save_failed_list(fail_list)
+        if self.verify_only:
+            self.summary_label.setText(
+                f"前台檢查完成：已存在 {success}/{total}，不存在 {fail}　總花費 {elapsed // 60}分{elapsed % 60}秒"
+            )
+        else:
+            self.summary_label.setText(
+                f"全部完成：成功 {success}/{total}，失敗 {fail}　總花費 {elapsed // 60}分{elapsed % 60}秒"
+            )
+        self.save_failed_list(fail_list, VERIFY_MISSING_FILE if self.verify_only else FAILED_LIST_FILE)
         self.pause_resume_btn.setEnabled(False)
         self.is_paused = False
 
@@ -534,7 +527,14 @@ class BVShopMainWindow(QWidget):
         elapsed = time.time() - self.start_time if self.start_time else 0
         done = self.success_count + self.fail_count
         total = self.total_count
-        if done > 0 and total > done:
+        # 優先用 engine 依商品圖片數/規格數與實測時間估的剩餘時間，沒有時才用平均值
+        estimate = self.bv_batch_uploader.estimate_remaining() if self.bv_batch_uploader else None
+        if estimate is not None and total > done:
+            left = int(estimate)
+            self.summary_label.setText(
+                f"完成 {done} / {total}　成功 {self.success_count}　失敗 {self.fail_count}　預估剩餘 {left // 60}分{left % 60}秒"
+            )
+        elif done > 0 and total > done:
             avg = elapsed / done
             remaining = total - done
             left = int(avg * remaining)
@@ -563,57 +563,6 @@ class BVShopMainWindow(QWidget):
                 f"完成 {done} / {total}　成功 {self.success_count}　失敗 {self.fail_count}"
             )
 
-    def clear_widgets(self):
-        for i in reversed(range(self.grid_layout.count())):
-            item = self.grid_layout.itemAt(i)
-            if item:
-                wgt = item.widget()
-                if wgt:
-                    self.grid_layout.removeWidget(wgt)
-                    wgt.setParent(None)
-        self.product_widgets.clear()
-
-    def remove_widget(self, pname):
-        widget = self.product_widgets.get(pname)
-        if widget:
-            self.grid_layout.removeWidget(widget)
-            widget.setParent(None)
-            del self.product_widgets[pname]
-            self.re_layout_grid()
-
-    def refresh_widgets(self):
-        self.clear_widgets()
-        show_list = [k for k, v in self.product_status.items() if v["status"] in ["running", "fail"]]
-        for pname in show_list:
-            widget = ProductProgressItem(pname, self.show_log_dialog)
-            self.product_status[pname]["widget"] = widget
-            self.product_widgets[pname] = widget
-        self.re_layout_grid()
-
-    def re_layout_grid(self):
-        items = list(self.product_widgets.values())
-        if not items:
-            return
-        w = self.width()
-        card_width = 480
-        grid_w = max(1, w // (card_width + 32))
-        if grid_w < 1:
-            grid_w = 1
-        for i in reversed(range(self.grid_layout.count())):
-            item = self.grid_layout.itemAt(i)
-            if item:
-                wgt = item.widget()
-                if wgt:
-                    self.grid_layout.removeWidget(wgt)
-        for idx, wgt in enumerate(items):
-            row = idx // grid_w
-            col = idx % grid_w
-            self.grid_layout.addWidget(wgt, row, col)
-
-    def resizeEvent(self, event):
-        self.re_layout_grid()
-        return super().resizeEvent(event)
-
     def toggle_pause_resume(self):
         if not self.bv_batch_uploader:
             return
@@ -658,33 +607,22 @@ class BVShopMainWindow(QWidget):
             return
         with open(FAILED_LIST_FILE, "r", encoding="utf-8") as f:
             failed = json.load(f)
-        product_dirs = []
-        for name in failed:
-            pdir = os.path.join(src_dir, name)
-            if os.path.isdir(pdir) and \
-               os.path.exists(os.path.join(pdir, "product_info.json")) and \
-               os.path.exists(os.path.join(pdir, "product_output.json")):
-                product_dirs.append(pdir)
-        if not product_dirs:
-            self.summary_label.setText("失敗商品資料夾不存在或檔案不齊全")
+        if not failed:
+            self.summary_label.setText("沒有失敗商品可重跑")
             return
-        self.total_count = len(product_dirs)
+        self.verify_only = False
+        self.total_count = 0
         self.success_count = 0
         self.fail_count = 0
         self.start_time = time.time()
         self.product_status = {}
-        self.clear_widgets()
+        self.log_store = ProductLogStore()
+        self.product_model.clear()
         self.has_started = True
         self.overall_progress.setVisible(True)
         self.pause_resume_btn.setEnabled(True)
         self.pause_resume_btn.setText("暫停")
-        for p in product_dirs:
-            pname = os.path.basename(p)
-            self.product_status[pname] = {
-                "status": "waiting", "progress": 0, "log": "", "widget": None
-            }
         self.update_summary()
-        self.refresh_widgets()
         self.bv_batch_uploader = BVShopBatchUploader(
             src_dir=src_dir,
             username=username,
@@ -695,12 +633,20 @@ class BVShopMainWindow(QWidget):
             only_failed=failed,
             behavior_mode=behavior_mode,
             speed_status_callback=None,
-            round_status_callback=None
+            round_status_callback=None,
+            optimize_images=self.optimize_images_checkbox.isChecked(),
+            image_max_edge=self.image_edge_spin.value(),
+            preflight_check=self.preflight_checkbox.isChecked(),
+            block_assets=self.block_assets_checkbox.isChecked(),
+            cache_assets=self.cache_assets_checkbox.isChecked()
         )
-        self.bv_batch_uploader.product_progress_signal.connect(self.update_product_progress)
+        self.bv_batch_uploader.product_found_signal.connect(self.add_found_product)
+        self.bv_batch_uploader.progress_batch_signal.connect(self.update_products_batch)
         self.bv_batch_uploader.all_done_signal.connect(self.batch_all_done)
         self.bv_batch_uploader.paused_signal.connect(self.on_paused)
         self.bv_batch_uploader.resumed_signal.connect(self.on_resumed)
+        self.bv_batch_uploader.pool_size_signal.connect(self.update_pool_size)
+        self.bv_batch_uploader.log_signal.connect(self.on_batch_log)
         import threading
         def runner():
             self.bv_batch_uploader.batch_upload()
@@ -709,9 +655,9 @@ class BVShopMainWindow(QWidget):
         self.update_time_estimate()
         self.is_paused = False
 
-    def save_failed_list(self, fail_list):
+    def save_failed_list(self, fail_list, path=FAILED_LIST_FILE):
         failed = [item[0] for item in fail_list]
-        with open(FAILED_LIST_FILE, "w", encoding="utf-8") as f:
+        with open(path, "w", encoding="utf-8") as f:
             json.dump(failed, f, ensure_ascii=False, indent=2)
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+import os
+import sys
+import hashlib
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from cache_paths import CACHE_DIR
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 沒裝時整個壓縮階段停用，直接上傳原圖
+    Image = None
+    ImageOps = None
+
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, "images")
+FORMAT_EXT = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+def is_available():
+    return Image is not None
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def optimize_image(src, max_edge=1600, fmt="JPEG", quality=88, cache_dir=IMAGE_CACHE_DIR):
+    # 在子程序執行：縮到最長邊 max_edge、重新編碼並去掉 EXIF 等 metadata。
+    # 輸出以「原檔內容 hash + 參數」為鍵快取，重跑時直接回傳上次的檔案。
+    fmt = fmt.upper()
+    key = hashlib.sha1(f"{_file_hash(src)}:{max_edge}:{fmt}:{quality}".encode("utf-8")).hexdigest()
+    stem = os.path.splitext(os.path.basename(src))[0]
+    out_dir = os.path.join(cache_dir, key[:2], key)
+    out_path = os.path.join(out_dir, stem + FORMAT_EXT.get(fmt, ".jpg"))
+    keep_marker = os.path.join(out_dir, ".keep_original")
+    if os.path.isfile(out_path):
+        return out_path
+    if os.path.isfile(keep_marker):
+        return src
+    with Image.open(src) as im:
+        if getattr(im, "is_animated", False):
+            return src  # 動圖不處理
+        orig_size = im.size
+        im = ImageOps.exif_transpose(im)
+        if fmt == "JPEG" and im.mode not in ("RGB", "L"):
+            im = im.convert("RGBA")
+            bg = Image.new("RGB", im.size, (255, 255, 255))
+            bg.paste(im, mask=im.split()[-1])
+            im = bg
+        elif fmt == "WEBP" and im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        im.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        os.makedirs(out_dir, exist_ok=True)
+        tmp_path = out_path + ".tmp"
+        if fmt == "WEBP":
+            im.save(tmp_path, "WEBP", quality=quality, method=4)
+        else:
+            im.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    # 壓完反而比較大（例如本來就很小的 jpg）就用原檔，並記下來下次不必再壓
+    if os.path.getsize(tmp_path) >= os.path.getsize(src) and max(orig_size) <= max_edge:
+        os.remove(tmp_path)
+        open(keep_marker, "w").close()
+        return src
+    os.replace(tmp_path, out_path)
+    return out_path
+
+class ImageOptimizer:
+    def __init__(self, max_edge=1600, fmt="JPEG", quality=88, processes=None, log_func=None):
+        self.max_edge = max_edge
+        self.fmt = fmt
+        self.quality = quality
+        self.processes = processes or max(1, (os.cpu_count() or 2) - 1)
+        self.log_func = log_func or (lambda msg: print(msg, file=sys.stderr, flush=True))
+        self._pool = None
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._pool
+
+    async def _optimize_one(self, path):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._ensure_pool(), optimize_image, path, self.max_edge, self.fmt, self.quality
+            )
+        except Exception as e:
+            self.log_func(f"圖片壓縮失敗，改用原圖 {path}: {e}")
+            return path
+
+    async def optimize_record(self, record):
+        # 回傳換成壓縮後圖片路徑的 record（順序不變）
+        main_images = await asyncio.gather(*(self._optimize_one(p) for p in record.main_images))
+        desc_images = await asyncio.gather(*(self._optimize_one(p) for p in record.desc_images))
+        return record.with_images(list(main_images), list(desc_images))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
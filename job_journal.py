@@ -0,0 +1,112 @@
+import os
+import json
+import time
+from cache_paths import cache_path, short_hash
+
+QUEUED = "queued"
+STARTED = "started"
+SAVED = "saved"
+VERIFIED = "verified"
+SKIPPED = "skipped"
+FAILED = "failed"
+DONE_STATES = (SAVED, VERIFIED, SKIPPED)
+
+def journal_path(src_dir, domain="", kind=""):
+    # 同一個商品資料夾可能上架到不同商店，journal 依資料夾 + 前台網域分開；
+    # kind 給不影響上架狀態的執行（只檢查前台）另外一份檔案
+    key = os.path.abspath(src_dir) + "|" + domain.rstrip("/")
+    suffix = f".{kind}" if kind else ""
+    return cache_path("journal", f"{short_hash(key)}{suffix}.jsonl")
+
+# append-only JSONL：每個商品的狀態變化一行，每行都 flush 到 OS，
+# fsync 則累積一段時間/筆數才做一次，程式被砍掉也只會掉最後幾行
+class JobJournal:
+    def __init__(self, path, resume=False, append=False, fsync_interval=1.0, fsync_every=100):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.fsync_every = fsync_every
+        # 只有完整的新執行才把舊 journal 換成 .prev；續跑與只跑部分商品都接在後面寫
+        if not resume and not append and os.path.exists(path):
+            os.replace(path, path + ".prev")
+        self._f = open(path, "a", encoding="utf-8")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._write({"event": "run_start", "resume": resume, "partial": append})
+
+    def _write(self, entry):
+        entry["ts"] = round(time.time(), 3)
+        self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self._unsynced += 1
+        now = time.monotonic()
+        if self._unsynced >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def record(self, pname, state, reason="", attempt=0, **extra):
+        entry = {"product": pname, "state": state}
+        if reason:
+            entry["reason"] = reason[:500]
+        if attempt:
+            entry["attempt"] = attempt
+        entry.update(extra)
+        self._write(entry)
+
+    def sync(self):
+        try:
+            os.fsync(self._f.fileno())
+        except OSError:
+            pass
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._f.closed:
+            return
+        self._write({"event": "run_end"})
+        self.sync()
+        self._f.close()
+
+def open_run_journal(src_dir, domain="", resume=False, verify_only=False, only_failed=None):
+    # 回傳 (journal, 續跑用的各商品最後狀態)
+    # 只檢查前台不會上架，寫到自己的檔案；重跑失敗商品接在原本的 journal 後面，
+    # 這兩種都不能輪替掉「接續上次」要用的紀錄
+    if verify_only:
+        return JobJournal(journal_path(src_dir, domain, "verify")), {}
+    path = journal_path(src_dir, domain)
+    states = load_journal_states(path) if resume else {}
+    return JobJournal(path, resume=resume, append=only_failed is not None), states
+
+def load_journal_states(path):
+    # 回傳 {商品名稱: 最後一筆紀錄}，最後一行寫到一半（程式當掉）就略過
+    states = {}
+    if not os.path.isfile(path):
+        return states
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            pname = entry.get("product")
+            if pname:
+                # 資料夾路徑只記在 queued 那行，往後的紀錄沿用
+                prev = states.get(pname)
+                if prev is not None and "pdir" in prev and "pdir" not in entry:
+                    entry["pdir"] = prev["pdir"]
+                states[pname] = entry
+    return states
+
+# 分片模式子程序用：介面同 JobJournal，但把紀錄丟回主程序統一寫檔
+class QueueJournal:
+    def __init__(self, queue, shard):
+        self.queue = queue
+        self.shard = shard
+
+    def record(self, pname, state, reason="", attempt=0, **extra):
+        self.queue.put(("journal", self.shard, (pname, state, reason, attempt, extra)))
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
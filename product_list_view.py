@@ -0,0 +1,148 @@
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen, QLinearGradient
+
+PERCENT_ROLE = Qt.UserRole + 1
+STATUS_ROLE = Qt.UserRole + 2
+
+CARD_WIDTH = 480
+CARD_HEIGHT = 124
+
+# 狀態 -> (icon, icon 顏色, 文字)
+STATUS_STYLE = {
+    "running": ("●", "#69b9ff", "進行中"),
+    "fail": ("✖", "#ff5f5f", "失敗"),
+    "success": ("✔", "#66e08c", "成功"),
+}
+
+# 只保存「進行中/失敗」商品的輕量資料（名稱、進度、狀態），
+# 更新時只通知變動的那一列，畫面由 delegate 依可見範圍繪製
+class ProductListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []   # [名稱, percent, status]
+        self._index = {}  # 名稱 -> row
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name, percent, status = self._rows[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return name
+        if role == PERCENT_ROLE:
+            return percent
+        if role == STATUS_ROLE:
+            return status
+        return None
+
+    def upsert(self, name, percent, status):
+        row = self._index.get(name)
+        if row is None:
+            row = len(self._rows)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._rows.append([name, percent, status])
+            self._index[name] = row
+            self.endInsertRows()
+            return
+        entry = self._rows[row]
+        if entry[1] == percent and entry[2] == status:
+            return
+        entry[1] = percent
+        entry[2] = status
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [PERCENT_ROLE, STATUS_ROLE])
+
+    def remove(self, name):
+        row = self._index.pop(name, None)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        for i in range(row, len(self._rows)):
+            self._index[self._rows[i][0]] = i
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._index = {}
+        self.endResetModel()
+
+    def name_at(self, index):
+        return self._rows[index.row()][0]
+
+# 畫出原本 ProductProgressItem 的卡片外觀：名稱、狀態、進度條
+class ProductItemDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name_font = QFont("SF Pro Text", 11)
+        self.name_font.setWeight(QFont.DemiBold)
+        self.status_font = QFont("SF Pro Text", 11)
+
+    def sizeHint(self, option, index):
+        return QSize(CARD_WIDTH, CARD_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = option.rect.adjusted(8, 8, -8, -8)
+        hover = bool(option.state & QStyle.State_MouseOver)
+        painter.setPen(QPen(QColor("#69b9ff" if hover else "#24304a"), 2.2))
+        painter.setBrush(QColor("#232a3d"))
+        painter.drawRoundedRect(rect, 28, 28)
+        inner = rect.adjusted(28, 10, -28, -12)
+
+        # 商品名稱，超長自動省略
+        name = index.data(Qt.DisplayRole) or ""
+        painter.setFont(self.name_font)
+        painter.setPen(QColor("#e5e6ea"))
+        name_rect = QRect(inner.left(), inner.top(), inner.width(), 26)
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         QFontMetrics(self.name_font).elidedText(name, Qt.ElideRight, inner.width()))
+
+        # 狀態 icon 與文字
+        icon, color, text = STATUS_STYLE.get(index.data(STATUS_ROLE), STATUS_STYLE["running"])
+        painter.setFont(self.status_font)
+        painter.setPen(QColor(color))
+        painter.drawText(QRect(inner.left(), inner.top() + 30, 24, 26), Qt.AlignCenter, icon)
+        painter.setPen(QColor("#e5e6ea"))
+        painter.drawText(QRect(inner.left() + 36, inner.top() + 30, inner.width() - 36, 26),
+                         Qt.AlignLeft | Qt.AlignVCenter, text)
+
+        # 進度條
+        percent = index.data(PERCENT_ROLE) or 0
+        bar = QRect(inner.left(), inner.bottom() - 28, inner.width(), 28)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#1b2230"))
+        painter.drawRoundedRect(bar, 14, 14)
+        if percent > 0:
+            fill = QRect(bar.left(), bar.top(), max(28, bar.width() * percent // 100), bar.height())
+            grad = QLinearGradient(bar.left(), 0, bar.right(), 0)
+            grad.setColorAt(0, QColor("#69b9ff"))
+            grad.setColorAt(1, QColor("#7f53ff"))
+            painter.setBrush(grad)
+            painter.drawRoundedRect(fill, 14, 14)
+        painter.setPen(QColor("#e5e6ea"))
+        painter.drawText(bar, Qt.AlignCenter, f"{percent}%")
+        painter.restore()
+
+# 卡片格狀排列、自動換行；固定大小的項目讓 Qt 只繪製看得到的部分
+class ProductListView(QListView):
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setItemDelegate(ProductItemDelegate(self))
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setSpacing(10)
+        self.setMouseTracking(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setStyleSheet("QListView { background: transparent; border: none; }")
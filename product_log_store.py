@@ -0,0 +1,60 @@
+import os
+import time
+import shutil
+from collections import deque
+from cache_paths import cache_path, short_hash
+
+RING_SIZE = 200   # 每個商品在記憶體裡只留最近幾行
+KEEP_RUNS = 10    # 保留最近幾次執行的 log 資料夾
+
+# 每個商品的 log：記憶體只留 ring buffer，完整內容寫到該商品自己的檔案，
+# 要看完整 log 時才從檔案讀
+class ProductLogStore:
+    def __init__(self, log_dir=None, ring_size=RING_SIZE):
+        if log_dir is None:
+            root = os.path.dirname(cache_path("logs", "x"))
+            log_dir = os.path.join(root, time.strftime("%Y%m%d_%H%M%S"))
+            self._prune(root)
+        self.log_dir = log_dir
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.ring_size = ring_size
+        self._rings = {}
+
+    def _prune(self, root):
+        try:
+            runs = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+        except OSError:
+            return
+        # 加上這次新建的資料夾剛好保留 KEEP_RUNS 份
+        excess = len(runs) - (KEEP_RUNS - 1)
+        for d in runs[:max(0, excess)]:
+            shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+
+    def path(self, pname):
+        return os.path.join(self.log_dir, f"{short_hash(pname)}.log")
+
+    def append(self, pname, lines):
+        if not lines:
+            return
+        ring = self._rings.get(pname)
+        if ring is None:
+            ring = self._rings[pname] = deque(maxlen=self.ring_size)
+        ring.extend(lines)
+        try:
+            with open(self.path(pname), "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError:
+            pass  # 寫檔失敗時至少還有 ring buffer
+
+    def tail(self, pname):
+        return list(self._rings.get(pname, ()))
+
+    def read_all(self, pname):
+        try:
+            with open(self.path(pname), encoding="utf-8") as f:
+                return f.read().rstrip("\n")
+        except OSError:
+            return "\n".join(self.tail(pname))
+
+    def clear(self):
+        self._rings.clear()
@@ -1,8 +1,11 @@
+from collections import deque
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QPushButton, QPlainTextEdit
 )
 from PyQt5.QtCore import Qt
 
+LOG_MAX_LINES = 500  # 卡片上的 log 只留最近幾行，完整內容在 ProductLogStore 的檔案裡
+
 class ProductProgressItem(QWidget):
     def __init__(self, name):
         super().__init__()
@@ -63,6 +66,7 @@ class ProductProgressItem(QWidget):
         self.log_box.setVisible(False)
         self.log_box.setMaximumHeight(90)
         self.log_box.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.log_box.setMaximumBlockCount(LOG_MAX_LINES)
         self.log_box.setStyleSheet("font-size:0.97em; background:#202428; border:1px solid #333; border-radius:5px;")
         outer_layout.addWidget(self.log_box)
 
@@ -71,7 +75,7 @@ class ProductProgressItem(QWidget):
 
         self.log_box.setContextMenuPolicy(Qt.DefaultContextMenu)
 
-        self._log_lines = []
+        self._log_lines = deque(maxlen=LOG_MAX_LINES)
 
     def update_progress(self, percent, stage_msg=None):
         self.progress_bar.setValue(percent)
@@ -92,8 +96,9 @@ class ProductProgressItem(QWidget):
             self.status_label.setToolTip(f"耗時 {elapsed//60}分{elapsed%60}秒")
 
     def append_log(self, msg):
+        # 只接上新的一行，不重設整段文字
         self._log_lines.append(msg)
-        self.log_box.setPlainText('\n'.join(self._log_lines))
+        self.log_box.appendPlainText(msg)
 
     def toggle_log(self, checked):
         self.log_box.setVisible(checked)
@@ -0,0 +1,128 @@
+import os
+import re
+import json
+import threading
+from pathlib import Path
+
+INFO_FILE = "product_info.json"
+OUTPUT_FILE = "product_output.json"
+
+def natural_keys(text):
+    return [int(c) if c.isdigit() else c for c in re.split(r'(\d+)', text)]
+
+# 一個商品資料夾解析、驗證後的結果，整批共用（重試、重跑失敗商品都不用再讀檔）
+class ProductRecord:
+    __slots__ = (
+        "pdir", "name", "info_path", "output_path", "info", "output",
+        "main_images", "desc_images", "slug", "error", "stamp", "image_stamps",
+    )
+
+    def __init__(self, pdir, stamp=None):
+        self.pdir = pdir
+        self.name = os.path.basename(pdir)
+        self.info_path = os.path.join(pdir, INFO_FILE)
+        self.output_path = os.path.join(pdir, OUTPUT_FILE)
+        self.info = {}
+        self.output = {}
+        self.main_images = []
+        self.desc_images = []
+        self.slug = ""
+        self.error = ""
+        self.stamp = stamp
+        self.image_stamps = ()
+
+    @property
+    def ok(self):
+        return not self.error
+
+    def with_images(self, main_images, desc_images):
+        # 回傳換掉圖片路徑的副本（例如壓縮後的圖），快取裡的原 record 不動
+        record = ProductRecord(self.pdir, self.stamp)
+        for attr in self.__slots__:
+            setattr(record, attr, getattr(self, attr))
+        record.main_images = main_images
+        record.desc_images = desc_images
+        return record
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def _images_unchanged(record):
+    try:
+        return all(_file_stamp(path) == stamp for path, stamp in record.image_stamps)
+    except OSError:
+        return False
+
+def load_product_record(pdir):
+    # 以兩個 json 與所有圖檔的 mtime/size 當快取鍵，都沒變就直接回傳上次的結果；
+    # 驗證失敗的結果不快取，使用者補上檔案後重跑就會重新檢查
+    try:
+        stamp = (_file_stamp(os.path.join(pdir, INFO_FILE)), _file_stamp(os.path.join(pdir, OUTPUT_FILE)))
+    except OSError as e:
+        record = ProductRecord(pdir)
+        record.error = f"商品資料檔不存在: {e}"
+        return record
+    with _cache_lock:
+        cached = _cache.get(pdir)
+    if cached is not None and cached.stamp == stamp and _images_unchanged(cached):
+        return cached
+    record = _parse_record(pdir, stamp)
+    with _cache_lock:
+        if record.ok:
+            _cache[pdir] = record
+        else:
+            _cache.pop(pdir, None)
+    return record
+
+def _parse_record(pdir, stamp):
+    record = ProductRecord(pdir, stamp)
+    try:
+        with open(record.info_path, encoding="utf-8") as f:
+            record.info = json.load(f)
+    except Exception as e:
+        record.error = f"商品資料(product_info.json)壞掉: {e}"
+        return record
+    try:
+        with open(record.output_path, encoding="utf-8") as f:
+            record.output = json.load(f)
+    except Exception as e:
+        record.error = f"商品資料(product_output.json)壞掉: {e}"
+        return record
+    if not isinstance(record.info, dict):
+        record.error = "商品資料(product_info.json)格式錯誤：最外層不是物件"
+        return record
+    if not isinstance(record.output, dict):
+        record.error = "商品資料(product_output.json)格式錯誤：最外層不是物件"
+        return record
+    slug = record.info.get("商品網址SLUG") or record.output.get("product_slug", "")
+    record.slug = slug if isinstance(slug, str) else ""
+    main_images = record.output.get("main_images_local") or []
+    desc_images = record.output.get("desc_images_local") or []
+    for key, images in (("main_images_local", main_images), ("desc_images_local", desc_images)):
+        if not isinstance(images, list) or not all(isinstance(f, str) for f in images):
+            record.error = f"商品資料(product_output.json)格式錯誤：{key} 必須是檔案路徑清單"
+            return record
+    not_exist_files = [f for f in main_images if not os.path.exists(f)]
+    if not_exist_files:
+        record.error = f"主圖檔案不存在: {not_exist_files}"
+        return record
+    not_exist_desc_files = [f for f in desc_images if not os.path.exists(f)]
+    if not_exist_desc_files:
+        record.error = f"描述圖檔案不存在: {not_exist_desc_files}"
+        return record
+    try:
+        record.image_stamps = tuple((f, _file_stamp(f)) for f in main_images + desc_images)
+    except OSError as e:
+        record.error = f"圖檔讀取失敗: {e}"
+        return record
+    record.main_images = sorted(main_images, key=lambda x: natural_keys(Path(x).name))
+    record.desc_images = sorted(desc_images, key=lambda x: natural_keys(Path(x).name))
+    return record
+
+def clear_record_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cache_paths import cache_path, short_hash
+from product_record import INFO_FILE, OUTPUT_FILE
+
+def is_product_dir(pdir):
+    return (
+        os.path.isdir(pdir) and
+        os.path.exists(os.path.join(pdir, INFO_FILE)) and
+        os.path.exists(os.path.join(pdir, OUTPUT_FILE))
+    )
+
+def _has_product_files(pdir):
+    # 一次 scandir 取代兩次 stat，網路磁碟上差很多
+    try:
+        with os.scandir(pdir) as it:
+            names = {entry.name for entry in it}
+    except OSError:
+        return False
+    return INFO_FILE in names and OUTPUT_FILE in names
+
+# 用 os.scandir + thread pool 掃商品資料夾，邊掃邊回報；
+# 索引檔記錄每個子資料夾的 mtime，下次只重新檢查 mtime 有變的
+class ProductScanner:
+    def __init__(self, src_dir, only_names=None, index_path=None, max_threads=16, log_func=None):
+        self.src_dir = src_dir
+        self.only_names = only_names
+        self.index_path = index_path or cache_path(f"scan_index_{short_hash(os.path.abspath(src_dir))}.json")
+        self.max_threads = max_threads
+        self.log_func = log_func or (lambda msg: print(msg, file=sys.stderr, flush=True))
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("entries", {})
+        except Exception:
+            return {}
+
+    def _save_index(self, entries):
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"src_dir": os.path.abspath(self.src_dir), "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            self.log_func(f"儲存掃描索引失敗: {e}")
+
+    def _candidates(self):
+        if self.only_names is not None:
+            for name in self.only_names:
+                pdir = os.path.join(self.src_dir, name)
+                try:
+                    st = os.stat(pdir)
+                except OSError:
+                    continue
+                yield name, pdir, st.st_mtime_ns
+            return
+        with os.scandir(self.src_dir) as it:
+            for entry in it:
+                try:
+                    if not entry.is_dir():
+                        continue
+                    yield entry.name, entry.path, entry.stat().st_mtime_ns
+                except OSError:
+                    continue
+
+    def scan(self, on_found=None, should_stop=None):
+        # on_found(pdir) 在呼叫 scan 的執行緒上被呼叫，找到一個就回報一個
+        found = []
+
+        def report(pdir):
+            found.append(pdir)
+            if on_found is not None:
+                on_found(pdir)
+
+        if self.only_names is None and is_product_dir(self.src_dir):
+            report(self.src_dir)
+            return found
+
+        old_entries = self._load_index()
+        new_entries = {}
+        pending = {}
+        done = queue.Queue()
+        stopped = False
+
+        def collect(fut):
+            name, pdir, mtime = pending.pop(fut)
+            if fut.cancelled():
+                return
+            ok = fut.result()
+            new_entries[name] = [mtime, ok]
+            if ok:
+                report(pdir)
+
+        with ThreadPoolExecutor(max_workers=self.max_threads) as pool:
+            # 列舉目錄與檢查資料夾同時進行，檢查完的隨時回報，不必等整個目錄列完
+            for name, pdir, mtime in self._candidates():
+                if should_stop is not None and should_stop():
+                    stopped = True
+                    break
+                cached = old_entries.get(name)
+                if cached and cached[0] == mtime:
+                    new_entries[name] = cached
+                    if cached[1]:
+                        report(pdir)
+                else:
+                    fut = pool.submit(_has_product_files, pdir)
+                    pending[fut] = (name, pdir, mtime)
+                    fut.add_done_callback(done.put)
+                while True:
+                    try:
+                        collect(done.get_nowait())
+                    except queue.Empty:
+                        break
+            if stopped:
+                for fut in list(pending):
+                    fut.cancel()
+            while pending:
+                collect(done.get())
+        if self.only_names is not None or stopped:
+            # 只掃部分資料夾或中途停止時，沒掃到的資料夾沿用舊紀錄
+            merged = dict(old_entries)
+            merged.update(new_entries)
+            new_entries = merged
+        self._save_index(new_entries)
+        return found
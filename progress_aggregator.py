@@ -0,0 +1,27 @@
+import threading
+
+# 進度事件先在 engine 的執行緒收集起來，GUI 以固定頻率一次取走：
+# 同一個商品只留最新的 percent/狀態，中間的 log 行累積起來一起送
+class ProgressAggregator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def add(self, pname, percent, success, elapsed, msg):
+        with self._lock:
+            entry = self._pending.get(pname)
+            if entry is None:
+                entry = self._pending[pname] = [percent, success, elapsed, []]
+            else:
+                entry[0] = percent
+                entry[1] = success
+                if elapsed is not None:
+                    entry[2] = elapsed
+            if msg:
+                entry[3].append(msg)
+
+    def drain(self):
+        # 回傳 [(商品名稱, percent, success, elapsed, [新的 log 行]), ...]，依第一次出現的順序
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [(pname, e[0], e[1], e[2], e[3]) for pname, e in pending.items()]
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+from cache_paths import cache_path
+
+STAGES = (
+    "setup", "goto", "cloudflare", "main_images", "fields", "specs",
+    "description_html", "description_images", "thumbnail_wait", "save",
+)
+THROUGHPUT_BUCKET = 60  # 秒，吞吐量以每分鐘完成件數統計
+SLOWEST_COUNT = 10
+
+# 單一商品的分段計時：mark(下一段名稱) 會結束上一段，finish() 結束最後一段
+class StageTimer:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.durations = {}
+        self._current = None
+        self._current_start = self.started
+
+    def mark(self, stage):
+        now = time.monotonic()
+        if self._current is not None:
+            self.durations[self._current] = self.durations.get(self._current, 0.0) + now - self._current_start
+        self._current = stage
+        self._current_start = now
+
+    def finish(self):
+        self.mark(None)
+        return time.monotonic() - self.started
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+# 整批的計時報告：每次上架嘗試一筆，批次結束時寫成 JSON 與文字摘要表
+class RunReport:
+    def __init__(self, name=""):
+        self.started_at = time.time()
+        self.name = re.sub(r"[^\w.-]+", "_", name)  # 檔名後綴（fanout 的 target、分片編號）
+        self.records = []
+
+    def add(self, pname, ok, durations, total, attempt=1):
+        self.records.append({
+            "product": pname,
+            "ok": ok,
+            "attempt": attempt,
+            "total": round(total, 3),
+            "stages": {k: round(v, 3) for k, v in durations.items()},
+            "finished": round(time.time() - self.started_at, 3),
+        })
+
+    def stage_stats(self):
+        stats = {}
+        names = list(STAGES) + sorted({k for r in self.records for k in r["stages"]} - set(STAGES))
+        for name in names + ["total"]:
+            if name == "total":
+                values = [r["total"] for r in self.records]
+            else:
+                values = [r["stages"][name] for r in self.records if name in r["stages"]]
+            if values:
+                stats[name] = {
+                    "count": len(values),
+                    "p50": round(percentile(values, 50), 3),
+                    "p95": round(percentile(values, 95), 3),
+                    "max": round(max(values), 3),
+                    "sum": round(sum(values), 3),
+                }
+        return stats
+
+    def throughput(self):
+        # [(第幾分鐘, 該分鐘成功件數)]
+        buckets = {}
+        for r in self.records:
+            if r["ok"]:
+                b = int(r["finished"] // THROUGHPUT_BUCKET)
+                buckets[b] = buckets.get(b, 0) + 1
+        if not buckets:
+            return []
+        return [(b, buckets.get(b, 0)) for b in range(max(buckets) + 1)]
+
+    def slowest(self):
+        done = [r for r in self.records if r["ok"]]
+        done.sort(key=lambda r: r["total"], reverse=True)
+        return [{"product": r["product"], "total": r["total"], "stages": r["stages"]} for r in done[:SLOWEST_COUNT]]
+
+    def summary_table(self):
+        stats = self.stage_stats()
+        lines = [f"{'階段':<20}{'次數':>6}{'p50':>9}{'p95':>9}{'max':>9}{'合計':>10}"]
+        for name, s in stats.items():
+            lines.append(f"{name:<20}{s['count']:>6}{s['p50']:>9.1f}{s['p95']:>9.1f}{s['max']:>9.1f}{s['sum']:>10.1f}")
+        ok = sum(1 for r in self.records if r["ok"])
+        elapsed = time.time() - self.started_at
+        rate = ok / elapsed * 60 if elapsed > 0 else 0.0
+        lines.append(f"成功 {ok} 件 / 嘗試 {len(self.records)} 次，平均每分鐘 {rate:.1f} 件")
+        slow = self.slowest()
+        if slow:
+            lines.append("最慢商品：" + "、".join(f"{s['product']}({s['total']:.0f}s)" for s in slow[:5]))
+        return "\n".join(lines)
+
+    def _open_new(self):
+        # 同一秒開始的報告用獨佔建立加流水號，不會互相覆蓋
+        stem = time.strftime("run_%Y%m%d_%H%M%S", time.localtime(self.started_at))
+        if self.name:
+            stem += f"_{self.name}"
+        for n in range(1, 1000):
+            path = cache_path("reports", f"{stem}.json" if n == 1 else f"{stem}_{n}.json")
+            try:
+                return path, open(path, "x", encoding="utf-8")
+            except FileExistsError:
+                continue
+        raise OSError(f"無法建立計時報告檔：{stem}")
+
+    def write(self, path=None):
+        # 回傳 (json 路徑, 文字摘要路徑)
+        if path is None:
+            path, f = self._open_new()
+        else:
+            f = open(path, "w", encoding="utf-8")
+        data = {
+            "started_at": self.started_at,
+            "elapsed": round(time.time() - self.started_at, 3),
+            "stages": self.stage_stats(),
+            "throughput_per_minute": self.throughput(),
+            "slowest": self.slowest(),
+            "records": self.records,
+        }
+        with f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        txt_path = os.path.splitext(path)[0] + ".txt"
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write(self.summary_table() + "\n")
+        return path, txt_path
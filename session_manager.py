@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import asyncio
+from playwright.async_api import async_playwright
+from cache_paths import cache_path, short_hash
+
+LOGIN_URL = "https://bvshop-manage.bvshop.tw/login"
+MANAGE_HOME_URL = "https://bvshop-manage.bvshop.tw/product"
+START_MAX_ATTEMPTS = 3     # 啟動瀏覽器 + 登入最多試幾次，全部失敗就放棄整批
+START_BACKOFF_BASE = 5.0   # 秒，第 n 次失敗後等 base * 2^(n-1)
+
+# 瀏覽器啟動或登入重試後仍失敗：整批都無法上架，由 engine 中止批次
+class SessionStartError(RuntimeError):
+    pass
+
+def session_state_path(username):
+    # 每個帳號各自一份 storage_state，避免多帳號互相覆蓋
+    return cache_path(f"session_{short_hash(username)}.json")
+
+def is_login_url(url):
+    return "/login" in (url or "")
+
+# 整批共用一個瀏覽器與已登入的 context，登入狀態存檔供下一輪/下一次沿用
+class BrowserSessionManager:
+    def __init__(self, username, password, headless=True, state_path=None, log_func=None, request_filter=None,
+                 asset_cache=None):
+        self.username = username
+        self.password = password
+        self.headless = headless
+        self.state_path = state_path or session_state_path(username)
+        self.log_func = log_func or (lambda msg: print(msg, file=sys.stderr, flush=True))
+        self.request_filter = request_filter  # 選用：擋掉字型、追蹤碼等後台表單用不到的請求
+        self.asset_cache = asset_cache        # 選用：後台 JS/CSS 從本機快取讀取
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.generation = 0  # 每重新登入一次 +1，讓多個 worker 同時發現過期時只登入一次
+        self.start_error = None  # 重試用完仍啟動失敗的原因；之後的 start() 直接丟出，不再每個商品各試一次
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._lock:
+            if self.start_error is not None:
+                raise SessionStartError(self.start_error)
+            if self.context is not None:
+                if self.browser is not None and self.browser.is_connected():
+                    return self.context
+                # 瀏覽器當掉或被關掉：收掉舊的，重新啟動
+                self.log_func("瀏覽器已中斷連線，重新啟動")
+                await self._shutdown()
+            for attempt in range(1, START_MAX_ATTEMPTS + 1):
+                try:
+                    self.context = await self._launch()
+                    return self.context
+                except Exception as e:
+                    if attempt >= START_MAX_ATTEMPTS:
+                        self.start_error = f"瀏覽器啟動/登入失敗（已試 {attempt} 次）: {e}"
+                        raise SessionStartError(self.start_error) from e
+                    delay = START_BACKOFF_BASE * (2 ** (attempt - 1))
+                    self.log_func(f"瀏覽器啟動/登入失敗，{delay:.0f} 秒後重試: {e}")
+                    await asyncio.sleep(delay)
+
+    async def _launch(self):
+        # 登入成功才回傳 context；中途失敗就把已啟動的瀏覽器收掉，下次從頭來
+        try:
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(headless=self.headless)
+            if os.path.isfile(self.state_path):
+                try:
+                    context = await self.browser.new_context(storage_state=self.state_path)
+                except Exception as e:
+                    self.log_func(f"登入狀態檔讀取失敗，改為重新登入: {e}")
+                    context = await self.browser.new_context()
+            else:
+                context = await self.browser.new_context()
+            # 快取要先註冊，請求才會先經過 filter 再 fallback 到快取
+            if self.asset_cache is not None:
+                await self.asset_cache.install(context)
+            if self.request_filter is not None:
+                await self.request_filter.install(context)
+            if await self.is_logged_in(context):
+                self.log_func("沿用已儲存的登入狀態")
+            else:
+                await self._login(context)
+        except Exception:
+            await self._shutdown()
+            raise
+        return context
+
+    async def is_logged_in(self, context=None):
+        page = await (context or self.context).new_page()
+        try:
+            await page.goto(MANAGE_HOME_URL, timeout=30000, wait_until="domcontentloaded")
+            if is_login_url(page.url):
+                return False
+            await page.wait_for_selector('header.main-header', timeout=15000)
+            return True
+        except Exception:
+            return False
+        finally:
+            await page.close()
+
+    async def _login(self, context=None):
+        context = context or self.context
+        page_login = await context.new_page()
+        try:
+            await page_login.goto(LOGIN_URL, timeout=30000)
+            await page_login.wait_for_selector('input[name="email"]', timeout=15000)
+            await page_login.fill('input[name="email"]', self.username)
+            await page_login.wait_for_selector('input[type="password"]', timeout=5000)
+            try:
+                await page_login.fill('input[type="password"].el-input__inner', self.password)
+            except Exception:
+                await page_login.fill('input[type="password"]', self.password)
+            await page_login.click('button[type="submit"]')
+            await page_login.wait_for_selector('header.main-header', timeout=15000)
+        finally:
+            await page_login.close()
+        self.generation += 1
+        self.log_func("登入完成")
+        await self.save_state(context)
+
+    async def save_state(self, context=None):
+        # 先寫暫存檔再 os.replace，多個程序共用同一個登入狀態檔時不會讀到寫一半的檔案
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            state = await (context or self.context).storage_state()
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            self.log_func(f"儲存登入狀態失敗: {e}")
+
+    async def relogin(self, seen_generation):
+        # 只有在沒有其他 worker 先重新登入過時才真的登入
+        async with self._lock:
+            if self.generation != seen_generation:
+                return
+            self.log_func("登入已過期，重新登入")
+            await self._login()
+
+    async def _shutdown(self):
+        # 關閉瀏覽器與 playwright；啟動失敗時也用來清掉做到一半的狀態
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+        if self.playwright is not None:
+            try:
+                await self.playwright.stop()
+            except Exception:
+                pass
+        self.context = None
+        self.browser = None
+        self.playwright = None
+
+    async def close(self):
+        async with self._lock:
+            if self.context is not None:
+                await self.save_state()
+                try:
+                    await self.context.close()
+                except Exception:
+                    pass  # 瀏覽器已經斷線時 context 也關不了
+            await self._shutdown()
+            if self.asset_cache is not None:
+                self.asset_cache.save()
+
+# 暖頁面池：上架成功的頁面留著給下一個商品用，省掉開新頁面與 TinyMCE 初始化；
+# 用滿 max_uses 次或出錯就關掉換新的，避免 renderer 記憶體越用越多。
+# 有共用的 budget（多商店同時跑）時，閒置頁面也算在 budget 的頁面數裡
+class PagePool:
+    def __init__(self, session, max_uses=20, max_idle=None, budget=None):
+        self.session = session
+        self.max_uses = max_uses
+        self.max_idle = max_idle or (lambda: 4)  # 閒置頁面上限，跟著目前併發數走
+        self.budget = budget
+        self._idle = []
+        self._uses = {}
+        self.created = 0
+        self.reused = 0
+        if budget is not None:
+            budget.register_pool(self)
+
+    def idle_count(self):
+        return len(self._idle)
+
+    def _pop_idle(self):
+        page = self._idle.pop()
+        if self.budget is not None:
+            self.budget.add_idle(-1)
+        return page
+
+    async def _close_page(self, page):
+        self._uses.pop(page, None)
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    async def acquire(self):
+        context = await self.session.start()
+        while self._idle:
+            page = self._pop_idle()
+            if page.is_closed() or page.context is not context:
+                self._uses.pop(page, None)
+                continue
+            self.reused += 1
+            return page
+        page = await context.new_page()
+        self._uses[page] = 0
+        self.created += 1
+        return page
+
+    async def release(self, page, healthy=True):
+        uses = self._uses.get(page, 0) + 1
+        self._uses[page] = uses
+        # budget 已經有人在等時不留閒置頁面，直接關掉讓出額度
+        contended = self.budget is not None and self.budget.waiting > 0
+        if (healthy and not page.is_closed() and uses < self.max_uses and not contended
+                and len(self._idle) < self.max_idle()):
+            self._idle.append(page)
+            if self.budget is not None:
+                self.budget.add_idle(1)
+            return
+        await self._close_page(page)
+
+    def shed(self):
+        # budget 額度不夠時呼叫：關掉最久沒用的閒置頁面
+        if not self._idle:
+            return
+        page = self._idle.pop(0)
+        if self.budget is not None:
+            self.budget.add_idle(-1)
+        asyncio.ensure_future(self._close_page(page))
+
+    async def close(self):
+        while self._idle:
+            await self._close_page(self._pop_idle())
+        if self.budget is not None:
+            self.budget.unregister_pool(self)
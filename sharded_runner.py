@@ -0,0 +1,170 @@
+import os
+import queue
+import threading
+import multiprocessing
+from batch_engine import BatchEngine, EventSignal
+from product_scanner import ProductScanner
+from job_journal import QueueJournal, open_run_journal, DONE_STATES, FAILED
+
+SHARD_START_STAGGER = 5.0  # 秒，錯開各程序啟動，第一個登入後其他程序可沿用存好的登入狀態
+FORWARDED_SIGNALS = ("product_progress", "all_done", "pool_size", "product_found", "log")
+SHARD_LOST_MSG = "分片程序異常結束，未取得結果"
+
+def split_shards(product_dirs, processes):
+    # 輪流分配，各分片商品數相差最多 1
+    shards = [product_dirs[i::processes] for i in range(max(1, processes))]
+    return [shard for shard in shards if shard]
+
+def _shard_main(shard, product_dirs, engine_kwargs, event_queue, stop_event, start_delay):
+    # 子程序：自己的 event loop、Playwright 瀏覽器與登入 context，事件全部丟回主程序
+    if stop_event.wait(start_delay):
+        event_queue.put(("exit", shard, ()))
+        return
+    engine = BatchEngine(
+        product_dirs=product_dirs, journal=QueueJournal(event_queue, shard), report_name=f"shard{shard}",
+        **engine_kwargs
+    )
+    for name in FORWARDED_SIGNALS:
+        getattr(engine, f"{name}_signal").connect(
+            lambda *args, name=name: event_queue.put((name, shard, args))
+        )
+
+    def watch_stop():
+        stop_event.wait()
+        engine.stop()
+    threading.Thread(target=watch_stop, daemon=True).start()
+    try:
+        engine.batch_upload()
+    except KeyboardInterrupt:
+        engine.stop()
+    except Exception as e:
+        event_queue.put(("log", shard, (f"分片 {shard} 異常結束: {e}",)))
+    finally:
+        event_queue.put(("exit", shard, ()))
+
+# 把商品資料夾分給 N 個程序，各自跑一個 BatchEngine；
+# 對外提供跟 BatchEngine 一樣的 signal，進度與 journal 都在主程序彙整
+class ShardedRunner:
+    def __init__(self, processes, **engine_kwargs):
+        self.processes = max(1, int(processes))
+        self.engine_kwargs = engine_kwargs
+        self.product_progress_signal = EventSignal()
+        self.all_done_signal = EventSignal()
+        self.pool_size_signal = EventSignal()
+        self.product_found_signal = EventSignal()
+        self.log_signal = EventSignal()
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop_event = self._ctx.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        kwargs = dict(self.engine_kwargs)
+        src_dir = kwargs["src_dir"]
+        resume = kwargs.pop("resume", False)
+        journal, states = open_run_journal(
+            src_dir, kwargs.get("product_domain", ""), resume=resume,
+            verify_only=kwargs.get("verify_only", False), only_failed=kwargs.get("only_failed")
+        )
+        done_names = {pname for pname, entry in states.items() if entry.get("state") in DONE_STATES}
+
+        total = 0
+        success = 0
+        fail_list = []
+        remaining = []
+        for pdir in ProductScanner(src_dir, only_names=kwargs.get("only_failed"), log_func=self.log_signal.emit).scan():
+            pname = os.path.basename(pdir)
+            if pname in done_names:
+                total += 1
+                success += 1
+                self.product_found_signal.emit(pname)
+                self.product_progress_signal.emit(pname, 100, True, 0, "上次已完成，續跑略過")
+            else:
+                remaining.append(pdir)
+
+        shards = split_shards(remaining, self.processes)
+        # 記下每個分片負責哪些商品，分片沒送出 all_done 就死掉時才知道要補哪些
+        shard_names = [[os.path.basename(pdir) for pdir in shard] for shard in shards]
+        finished_shards = set()
+        final_states = {}
+        if shards:
+            kwargs["image_processes"] = max(1, ((os.cpu_count() or 2) - 1) // len(shards))
+        event_queue = self._ctx.Queue()
+        procs = [
+            self._ctx.Process(
+                target=_shard_main,
+                args=(i, shard, kwargs, event_queue, self._stop_event, i * SHARD_START_STAGGER)
+            )
+            for i, shard in enumerate(shards)
+        ]
+        for proc in procs:
+            proc.start()
+        self.log_signal.emit(f"分成 {len(procs)} 個程序上架 {len(remaining)} 件商品")
+
+        alive = len(procs)
+        pool_sizes = {}
+
+        def handle(kind, shard, args):
+            nonlocal total, success
+            if kind == "journal":
+                pname, state, reason, attempt, extra = args
+                journal.record(pname, state, reason=reason, attempt=attempt, **extra)
+                if state in DONE_STATES or (state == FAILED and not extra.get("retry")):
+                    final_states[pname] = (state, reason)
+                else:
+                    final_states.pop(pname, None)
+            elif kind == "all_done":
+                finished_shards.add(shard)
+                shard_total, shard_success, shard_fail, shard_fail_list = args
+                total += shard_total
+                success += shard_success
+                fail_list.extend(shard_fail_list)
+            elif kind == "pool_size":
+                pool_sizes[shard] = args[0]
+                self.pool_size_signal.emit(sum(pool_sizes.values()), [])
+            elif kind != "exit":
+                getattr(self, f"{kind}_signal").emit(*args)
+
+        try:
+            while alive > 0:
+                try:
+                    kind, shard, args = event_queue.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(proc.is_alive() for proc in procs):
+                        break  # 子程序被砍掉、沒來得及送 exit
+                    continue
+                if kind == "exit":
+                    alive -= 1
+                handle(kind, shard, args)
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+        finally:
+            for proc in procs:
+                proc.join(timeout=60)
+                if proc.is_alive():
+                    proc.terminate()
+            # 子程序結束前送出、還留在佇列裡的事件
+            while True:
+                try:
+                    handle(*event_queue.get(timeout=0.2))
+                except queue.Empty:
+                    break
+            # 沒有送出 all_done 的分片：已有最終結果的照結果算，其餘一律記為失敗
+            for shard, names in enumerate(shard_names):
+                if shard in finished_shards:
+                    continue
+                for pname in names:
+                    total += 1
+                    state, reason = final_states.get(pname, (None, ""))
+                    if state in DONE_STATES:
+                        success += 1
+                        continue
+                    if state is None:
+                        reason = SHARD_LOST_MSG
+                        journal.record(pname, FAILED, reason=reason)
+                        self.product_progress_signal.emit(pname, 100, False, 0, reason)
+                    fail_list.append((pname, reason))
+            journal.close()
+        self.all_done_signal.emit(total, success, len(fail_list), fail_list)
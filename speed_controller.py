@@ -1,18 +1,31 @@
+import time
+import asyncio
+
 class BehaviorMode:
     SPEED = "speed"
     SAFE = "safe"
     AUTO = "auto"
 
 class SpeedController:
-    def __init__(self, mode=BehaviorMode.AUTO):
+    def __init__(self, mode=BehaviorMode.AUTO, max_workers=None, aimd=None):
         self.mode = mode
+        self.max_workers = max_workers
+        self.aimd = aimd
         self.safe_count = 0  # 連續遇到CF challenge次數
         self.speed_count = 0 # 連續沒遇到 challenge 次數
         self.current = BehaviorMode.SPEED
         self.CF_THRESHOLD = 2   # 幾次遇到 challenge 自動進入 safe
         self.SPEED_RECOVER = 8  # 幾件都沒遇到 challenge 自動回 speed
+        self._listeners = []
+
+    def add_listener(self, func):
+        # 模式切換時馬上通知（所有 worker 共用同一個 controller）
+        self._listeners.append(func)
 
     def update(self, cf_challenge_detected: bool):
+        before = self.current
+        if cf_challenge_detected and self.aimd is not None:
+            self.aimd.on_challenge()
         if self.mode == BehaviorMode.AUTO:
             if cf_challenge_detected:
                 self.safe_count += 1
@@ -24,9 +37,128 @@ class SpeedController:
                 self.speed_count += 1
                 if self.speed_count >= self.SPEED_RECOVER:
                     self.current = BehaviorMode.SPEED
+        if self.current != before:
+            for func in self._listeners:
+                func()
+
+    def record_save(self, seconds):
+        # 儲存成功且沒遇到 challenge，交給 AIMD 判斷要不要加 worker
+        if self.aimd is not None:
+            self.aimd.on_save(seconds)
+
+    def is_speed(self):
+        # 目前實際走極速（SPEED 模式，或 AUTO 還沒被 challenge 降到 safe）
+        return self.mode != BehaviorMode.SAFE and self.current != BehaviorMode.SAFE
 
     def get_params(self):
         if self.mode == BehaviorMode.SAFE or self.current == BehaviorMode.SAFE:
             return dict(delay=(0.3, 1.1), mouse_steps=6, scroll_times=1)
         else:
-            return dict(delay=(0.03, 0.08), mouse_steps=1, scroll_times=0)
\ No newline at end of file
+            return dict(delay=(0.03, 0.08), mouse_steps=1, scroll_times=0)
+
+    def concurrency_limit(self):
+        # 有 AIMD 時以它的 pool size 為準；否則自動模式進入 safe 時同時上架數減半，回到 speed 再恢復
+        if self.aimd is not None:
+            return self.aimd.size
+        if not self.max_workers:
+            return None
+        if self.mode == BehaviorMode.AUTO and self.current == BehaviorMode.SAFE:
+            return max(1, self.max_workers // 2)
+        return self.max_workers
+
+    def mode_label(self):
+        return (
+            "極速" if self.current == BehaviorMode.SPEED
+            else "安全" if self.current == BehaviorMode.SAFE
+            else "自動"
+        )
+
+class AIMDController:
+    # 加法增、乘法減：連續 N 件乾淨存檔加 1 個 worker，遇到 CF 或存檔變慢就砍半
+    def __init__(self, initial, min_size=1, max_size=16, increase_after=5,
+                 latency_factor=2.0, latency_min_rise=3.0, decrease_cooldown=20.0):
+        self.min_size = max(1, int(min_size))
+        self.max_size = max(self.min_size, int(max_size))
+        self.size = min(max(int(initial), self.min_size), self.max_size)
+        self.increase_after = increase_after
+        self.latency_factor = latency_factor      # 存檔時間超過基準幾倍算變慢
+        self.latency_min_rise = latency_min_rise  # 且至少比基準多幾秒，避免基準很小時誤判
+        self.decrease_cooldown = decrease_cooldown  # 同一波 CF 多個 worker 同時回報時只砍一次
+        self.clean_saves = 0
+        self.baseline_save = None  # 存檔時間 EWMA（秒）
+        self._last_decrease = None
+        self.history = [(time.time(), self.size, "初始")]
+        self._listeners = []
+
+    def add_listener(self, func):
+        self._listeners.append(func)
+
+    def on_save(self, seconds):
+        if self.baseline_save is not None and \
+           seconds > self.baseline_save * self.latency_factor and \
+           seconds - self.baseline_save > self.latency_min_rise:
+            self._decrease(f"存檔變慢 {seconds:.1f}s")
+        else:
+            self.clean_saves += 1
+            if self.clean_saves >= self.increase_after and self.size < self.max_size:
+                self._set_size(self.size + 1, f"連續 {self.clean_saves} 件成功")
+        if self.baseline_save is None:
+            self.baseline_save = seconds
+        else:
+            self.baseline_save = self.baseline_save * 0.8 + seconds * 0.2
+
+    def on_challenge(self):
+        self._decrease("Cloudflare")
+
+    def _decrease(self, reason):
+        self.clean_saves = 0
+        now = time.monotonic()
+        if self._last_decrease is not None and now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self._set_size(max(self.min_size, self.size // 2), reason)
+
+    def _set_size(self, size, reason):
+        self.clean_saves = 0
+        if size == self.size:
+            return
+        self.size = size
+        self.history.append((time.time(), size, reason))
+        for func in self._listeners:
+            func()
+
+class ConcurrencyGate:
+    # 可在執行中調整上限的 semaphore，調小時不打斷進行中的商品，只是不再放新的進來
+    def __init__(self, limit):
+        self._limit = max(1, int(limit))
+        self.active = 0
+        self._waiters = []
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def set_limit(self, limit):
+        self._limit = max(1, int(limit))
+        self._wake()
+
+    async def acquire(self):
+        while self.active >= self._limit:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            finally:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._wake()
+
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
@@ -1,19 +1,154 @@
 import os
+import sys
 import json
 import re
+import time
 import traceback
 import asyncio
 import random
 from pathlib import Path
 import aiohttp
+from product_record import load_product_record
+from run_report import StageTimer
 
-def natural_keys(text):
-    return [int(c) if c.isdigit() else c for c in re.split(r'(\d+)', text)]
+SESSION_EXPIRED_MSG = "RETRY:登入狀態已失效，重新登入後重試"
 
 def clean_desc_html(desc_html):
     desc_html = re.sub(r'<div class="ProductDetail-title[^>]*>.*?<\/div>', '', desc_html, flags=re.DOTALL)
     return desc_html.lstrip()
 
+WAIT_GRACE_MS = 50  # 條件成立後再留一點時間給前端框架收尾
+COUNT_AT_LEAST_JS = "([sel, n]) => document.querySelectorAll(sel).length >= n"
+# TinyMCE 圖片對話框：檔案上傳完成後「來源」欄位才會有網址
+DIALOG_SRC_READY_JS = "() => { const i = document.querySelector('.tox-dialog input.tox-textfield'); return !!(i && i.value); }"
+
+async def wait_for_condition(page, expression, arg=None, timeout=5000):
+    # 條件一成立就往下走；逾時回傳 False，由呼叫端決定要不要當成錯誤
+    try:
+        await page.wait_for_function(expression, arg=arg, timeout=timeout)
+    except Exception:
+        return False
+    await page.wait_for_timeout(WAIT_GRACE_MS)
+    return True
+
+async def insert_image_via_dialog(page, img_path):
+    # 開 TinyMCE 插入圖片對話框、選檔，等上傳完成才按儲存，再等對話框關閉
+    async with page.expect_file_chooser() as fc_info:
+        await page.locator('button[aria-label="插入/編輯圖片"],button[title="插入/編輯圖片"]').first.click()
+        await page.locator('button.tox-browse-url[title="圖片網址"]').click()
+    file_chooser = await fc_info.value
+    await file_chooser.set_files(str(Path(img_path)))
+    if not await wait_for_condition(page, DIALOG_SRC_READY_JS, timeout=15000):
+        # 上傳沒完成就不要按儲存（會插入空圖片），關掉對話框讓呼叫端重試
+        try:
+            await page.keyboard.press("Escape")
+            await page.wait_for_selector('.tox-dialog', state='detached', timeout=5000)
+        except Exception:
+            pass
+        raise RuntimeError(f"圖片上傳逾時，對話框沒有取得圖片網址：{img_path}")
+    await page.locator('div.tox-dialog button.tox-button:has-text("儲存")').click()
+    try:
+        await page.wait_for_selector('.tox-dialog', state='detached', timeout=5000)
+    except Exception:
+        pass
+
+# 極速模式一次設定多個欄位：用原生 value setter 設值再送 input/change，Vue/Element 才會收到；
+# 等一個 frame 後讀回來，回傳沒找到或值沒吃進去的 selector
+FILL_FIELDS_JS = '''
+async (fields) => {
+    const find = sel => sel.startsWith('//')
+        ? document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+        : document.querySelector(sel);
+    const els = fields.map(([sel, value]) => {
+        const el = find(sel);
+        if (el) {
+            const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+            Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+        }
+        return el;
+    });
+    await new Promise(r => requestAnimationFrame(() => setTimeout(r, 0)));
+    return fields.filter(([sel, value], i) => !els[i] || els[i].value !== value).map(([sel]) => sel);
+}
+'''
+
+async def fill_fields_bulk(page, fields, timeout):
+    # fields: [(selector, 值)]；一次 evaluate 填完，沒填進去的再逐欄 page.fill。回傳一次到位的欄位數
+    try:
+        missed = set(await page.evaluate(FILL_FIELDS_JS, [[sel, val] for sel, val in fields]))
+    except Exception:
+        missed = {sel for sel, _ in fields}
+    for sel, val in fields:
+        if sel in missed:
+            await page.wait_for_selector(sel, timeout=timeout)
+            await page.fill(sel, val)
+    return len(fields) - len(missed)
+
+BULK_INPUT_ID = "__bv_bulk_desc_images"
+# 一次把所有描述圖放進 TinyMCE 的 blobCache、替換 desc-img-N 錨點（沒有錨點就接在文末），
+# 再呼叫 editor.uploadImages() 用編輯器本身的上傳設定一次傳完，blob 網址會被換成回傳的網址。
+# 任何一步失敗就把內容還原，回傳 ok=false 讓呼叫端改走逐張對話框。
+BULK_DESC_IMAGES_JS = '''
+async ({inputId, useSpans}) => {
+    const ed = window.tinymce && (tinymce.get('description') || tinymce.activeEditor);
+    if (!ed || !ed.editorUpload || typeof ed.uploadImages !== 'function') {
+        return {ok: false, error: '找不到 TinyMCE 上傳介面'};
+    }
+    const input = document.getElementById(inputId);
+    const files = input ? Array.from(input.files) : [];
+    const body = ed.getBody();
+    const snapshot = body.innerHTML;
+    const readBase64 = f => new Promise((resolve, reject) => {
+        const r = new FileReader();
+        r.onload = () => resolve(String(r.result).split(',')[1]);
+        r.onerror = () => reject(r.error);
+        r.readAsDataURL(f);
+    });
+    try {
+        const cache = ed.editorUpload.blobCache;
+        for (let i = 0; i < files.length; i++) {
+            const info = cache.create('bvdesc' + Date.now() + '_' + i, files[i], await readBase64(files[i]));
+            cache.add(info);
+            const img = ed.getDoc().createElement('img');
+            img.setAttribute('src', info.blobUri());
+            const span = useSpans ? body.querySelector('span#desc-img-' + (i + 1)) : null;
+            if (span) span.replaceWith(img); else body.appendChild(img);
+        }
+        const results = await ed.uploadImages();
+        const failed = (results || []).filter(r => !r.status).length;
+        const left = Array.from(body.querySelectorAll('img')).filter(im => im.src.startsWith('blob:')).length;
+        if (failed || left) throw new Error('上傳失敗 ' + failed + ' 張，未替換 ' + left + ' 張');
+        ed.undoManager.add();
+        ed.fire('change');
+        ed.save();
+        return {ok: true, count: files.length};
+    } catch (e) {
+        body.innerHTML = snapshot;
+        return {ok: false, error: String(e)};
+    } finally {
+        if (input) input.remove();
+    }
+}
+'''
+
+async def bulk_insert_desc_images(page, desc_images, use_spans):
+    # 用隱藏的 multiple file input 一次交出所有檔案，不用開對話框、不用 file chooser
+    await page.evaluate('''id => {
+        let input = document.getElementById(id);
+        if (!input) {
+            input = document.createElement('input');
+            input.type = 'file';
+            input.multiple = true;
+            input.id = id;
+            input.style.display = 'none';
+            document.body.appendChild(input);
+        }
+    }''', BULK_INPUT_ID)
+    await page.set_input_files(f'#{BULK_INPUT_ID}', [str(Path(p)) for p in desc_images])
+    return await page.evaluate(BULK_DESC_IMAGES_JS, {"inputId": BULK_INPUT_ID, "useSpans": use_spans})
+
 def has_desc_img_spans(desc_html):
     return bool(re.search(r'<span\s+id=["\']desc-img-\d+["\']', desc_html, re.IGNORECASE))
 
@@ -79,26 +214,87 @@ async def try_solve_cf_challenge(page, log_func):
         log_func(100, f"點擊Cloudflare核取方塊出錯: {e}\n{traceback.format_exc()}")
     return False
 
-async def head_check_product_url(slug, domain, log_func=None):
-    if log_func is None:
-        log_func = lambda percent, msg: print(f"PROGRESS:{percent}:{msg}", flush=True)
-    domain = domain.rstrip('/')
-    product_url = f"{domain}/item/{slug}"
+def _default_head_log(percent, msg):
+    # stdout 留給 CLI 的 JSON 事件，沒指定 log_func 時寫到 stderr
+    print(f"PROGRESS:{percent}:{msg}", file=sys.stderr, flush=True)
+
+# 整批共用一個 aiohttp session（keep-alive 連線池），HEAD 檢查可以大量並行
+class HeadChecker:
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, domain, concurrency=16, per_host=8, max_retries=3, timeout=10):
+        self.domain = domain.rstrip('/')
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._session = None
+        self._sem = asyncio.Semaphore(concurrency)
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency, limit_per_host=self.per_host,
+                keepalive_timeout=30, ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def _retry_delay(self, attempt, resp=None):
+        # 有 Retry-After 就照著等，否則指數退避加 jitter
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(30.0, float(retry_after))
+        return min(8.0, 0.5 * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    async def check(self, slug, log_func=None):
+        if log_func is None:
+            log_func = _default_head_log
+        product_url = f"{self.domain}/item/{slug}"
+        async with self._sem:
+            for attempt in range(self.max_retries + 1):
+                last_try = attempt == self.max_retries
+                try:
+                    async with self._get_session().head(product_url, allow_redirects=True) as resp:
+                        if resp.status == 200:
+                            log_func(101, f"前台 HEAD 檢查：商品頁面 {product_url} 已存在 (HTTP 200)")
+                            return True, resp.status
+                        if resp.status in self.RETRY_STATUS and not last_try:
+                            await asyncio.sleep(self._retry_delay(attempt, resp))
+                            continue
+                        log_func(100, f"前台 HEAD 檢查：商品頁面 {product_url} 不存在，狀態碼: {resp.status}")
+                        return False, resp.status
+                except Exception as e:
+                    if not last_try:
+                        await asyncio.sleep(self._retry_delay(attempt))
+                        continue
+                    log_func(100, f"前台 HEAD 檢查異常: {e}")
+                    return False, "EXCEPTION"
+
+    async def check_many(self, slugs, log_func=None):
+        return await asyncio.gather(*(self.check(slug, log_func) for slug in slugs))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+async def head_check_product_url(slug, domain, log_func=None, checker=None):
+    if checker is not None:
+        return await checker.check(slug, log_func)
+    checker = HeadChecker(domain, concurrency=1, per_host=1, max_retries=0)
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.head(product_url, timeout=10, allow_redirects=True) as resp:
-                if resp.status == 200:
-                    log_func(101, f"前台 HEAD 檢查：商品頁面 {product_url} 已存在 (HTTP 200)")
-                    return True, resp.status
-                else:
-                    log_func(100, f"前台 HEAD 檢查：商品頁面 {product_url} 不存在，狀態碼: {resp.status}")
-                    return False, resp.status
-    except Exception as e:
-        log_func(100, f"前台 HEAD 檢查異常: {e}")
-        return False, "EXCEPTION"
+        return await checker.check(slug, log_func)
+    finally:
+        await checker.close()
 
 async def upload_single_product_async(
-    context, info_path, output_path, pname, signal_func, domain="https://gd.bvshop.tw", speed_params=None
+    context, info_path, output_path, pname, signal_func, domain="https://gd.bvshop.tw", speed_params=None,
+    speed_controller=None, record=None, request_filter=None, page=None,
+    stage_timer=None
 ):
     def log_func(percent, msg):
         signal_func.emit(pname, percent, None, None, msg)
@@ -107,12 +303,26 @@ async def upload_single_product_async(
     if speed_params is None:
         speed_params = dict(delay=(0.08, 0.15), mouse_steps=2, scroll_times=1)
 
+    # 有共用 controller 時每次動作前都重新讀取，其他 worker 遇到 challenge 會馬上生效
+    def current_params():
+        if speed_controller is not None:
+            return speed_controller.get_params()
+        return speed_params
+
+    cf_reported = False
+
+    def report_cf():
+        nonlocal cf_reported
+        if speed_controller is not None and not cf_reported:
+            speed_controller.update(True)
+        cf_reported = True
+
     async def human_delay():
-        await asyncio.sleep(random.uniform(*speed_params['delay']))
+        await asyncio.sleep(random.uniform(*current_params()['delay']))
 
     async def random_mouse_move(page, steps=None):
         if steps is None:
-            steps = speed_params['mouse_steps']
+            steps = current_params()['mouse_steps']
         if steps == 0:
             return
         width = await page.evaluate("window.innerWidth")
@@ -125,34 +335,22 @@ async def upload_single_product_async(
 
     async def random_scroll(page, times=None):
         if times is None:
-            times = speed_params['scroll_times']
+            times = current_params()['scroll_times']
         for _ in range(times):
             scroll_y = random.randint(100, 700)
             await page.evaluate(f"window.scrollBy(0, {scroll_y});")
             await asyncio.sleep(random.uniform(0.05, 0.15))
 
-    try:
-        with open(info_path, encoding="utf-8") as f:
-            info = json.load(f)
-        with open(output_path, encoding="utf-8") as f:
-            output = json.load(f)
-    except Exception as e:
-        signal_func.emit(pname, 100, False, 0, f"讀取商品資訊檔失敗: {e}\n{traceback.format_exc()}")
-        return False, "讀取商品資訊檔失敗", False
-
-    main_images = output.get("main_images_local", [])
-    desc_images = output.get("desc_images_local", [])
-    not_exist_files = [f for f in main_images if not os.path.exists(f)]
-    not_exist_desc = [f for f in desc_images if not os.path.exists(f)]
-    if not_exist_files:
-        signal_func.emit(pname, 100, False, 0, f"❌ 主圖檔案不存在: {not_exist_files}")
-        return False, "主圖檔案不存在", False
-    if not_exist_desc:
-        signal_func.emit(pname, 100, False, 0, f"❌ 描述圖檔案不存在: {not_exist_desc}")
-        return False, "描述圖檔案不存在", False
-
-    main_images = sorted(main_images, key=lambda x: natural_keys(Path(x).name))
-    desc_images = sorted(desc_images, key=lambda x: natural_keys(Path(x).name))
+    # 批次流程會傳入已解析的 record；單獨呼叫時才在這裡讀檔（同樣走快取）
+    if record is None:
+        record = load_product_record(os.path.dirname(info_path))
+    if not record.ok:
+        signal_func.emit(pname, 100, False, 0, f"❌ {record.error}")
+        return False, record.error, False
+
+    info = record.info
+    main_images = record.main_images
+    desc_images = record.desc_images
     name = info.get("商品名稱", "")
     subtitle = info.get("商品副標題", "")
     summary_html = info.get("商品摘要HTML", "")
@@ -161,12 +359,30 @@ async def upload_single_product_async(
     seo_title = info.get("SEO標題", "")
     seo_description = info.get("SEO描述", "")
     seo_keywords = info.get("SEO關鍵字", "")
-    slug = info.get("商品網址SLUG") or output.get("product_slug", "")
+    slug = record.slug
 
     CREATE_URL = "https://bvshop-manage.bvshop.tw/product/create?type=1"
     browser_timeout = 5
 
-    page = await context.new_page()
+    # 分段計時：批次流程傳入 timer，結束後由它收尾並寫進報告
+    if stage_timer is None:
+        stage_timer = StageTimer()
+    stage_timer.mark("setup")
+
+    # 批次流程會從 page pool 借頁面進來，這時由呼叫端決定頁面要留用還是關掉
+    owns_page = page is None
+    if owns_page:
+        page = await context.new_page()
+
+    # 主圖縮圖在背景等，流程提早結束時要一起取消
+    thumbs_task = None
+
+    async def close_page():
+        if thumbs_task is not None and not thumbs_task.done():
+            thumbs_task.cancel()
+        if owns_page:
+            await page.close()
+
     cf_encountered = False
     try:
         # ==== 人類行為: 一進頁面隨機滑鼠與滾動 ====
@@ -176,7 +392,9 @@ async def upload_single_product_async(
         await human_delay()
 
         # ==== robust goto with retry, domcontentloaded ====
+        stage_timer.mark("goto")
         goto_retries = 3
+        goto_started = time.monotonic()
         for goto_try in range(goto_retries):
             try:
                 await page.goto(CREATE_URL, timeout=60000, wait_until='domcontentloaded')
@@ -185,27 +403,40 @@ async def upload_single_product_async(
                 await page.screenshot(path=f"debug_goto_fail_{goto_try}.png")
                 log_func(100, f"[goto重試] 進入建立頁失敗第{goto_try+1}次: {e}")
                 if goto_try == goto_retries-1:
-                    await page.close()
+                    if request_filter is not None:
+                        request_filter.forget(page)
+                    await close_page()
                     return False, f"進入建立頁超時: {e}", cf_encountered
                 await asyncio.sleep(4)
         page_title = await page.title()
         log_func(8, f"載入頁面完成，現頁title: {page_title} url: {page.url}")
+        if request_filter is not None:
+            log_func(8, request_filter.page_done(page, time.monotonic() - goto_started))
+
+        # 被導回登入頁代表 session 過期，交給批次流程重新登入後再試
+        if "/login" in page.url:
+            log_func(100, "⚠️ 被導回登入頁，登入狀態已失效")
+            await close_page()
+            return False, SESSION_EXPIRED_MSG, cf_encountered
 
         # Cloudflare防火牆直接退出
+        stage_timer.mark("cloudflare")
         if "cloudflare" in page_title.lower() or "just a moment" in page_title.lower():
             await page.screenshot(path="debug_cf_block.png")
             log_func(100, f"⚠️ 偵測到 Cloudflare 防火牆驗證頁，流程退出。")
-            await page.close()
+            report_cf()
+            await close_page()
             return False, "Cloudflare 防火牆驗證頁，流程退出", True
 
         cf_try = 0
         while await is_cloudflare_challenge(page):
             cf_encountered = True
+            report_cf()
             if cf_try > 5:
                 msg = "RETRY:Cloudflare 驗證多次仍卡住，暫時性錯誤"
                 log_func(100, msg)
                 await page.screenshot(path=f"cf_challenge_{cf_try}.png")
-                await page.close()
+                await close_page()
                 return False, msg, cf_encountered
             log_func(3, f"偵測到 Cloudflare 人機驗證頁面，進行破解第{cf_try+1}次")
             await try_solve_cf_challenge(page, log_func)
@@ -217,6 +448,7 @@ async def upload_single_product_async(
                 break
 
         # === 等主圖上傳按鈕 ===
+        stage_timer.mark("main_images")
         log_func(10, "等待主圖上傳... (檢查 .basic-upload 是否存在)")
         await human_delay()
         await random_mouse_move(page)
@@ -236,68 +468,74 @@ async def upload_single_product_async(
         else:
             msg = "主圖上傳按鈕(.basic-upload)找不到，請檢查 debug_basic_upload_not_found_*.png"
             log_func(100, msg)
-            await page.close()
+            await close_page()
             return False, msg, cf_encountered
 
         if main_images:
             await file_chooser.set_files(main_images)
             log_func(12, f"已上傳主圖 {len(main_images)} 張：{main_images}")
-            elapsed = 0
-            interval = 300
-            timeout = 18000
-            while elapsed < timeout:
-                img_count = await page.evaluate("() => document.querySelectorAll('#product-images-area img').length")
-                log_func(13, f"等待主圖縮圖顯示({img_count}/{len(main_images)})")
-                if img_count == len(main_images):
-                    log_func(14, f"所有主圖縮圖顯示完成")
-                    break
-                await page.wait_for_timeout(interval)
-                elapsed += interval
-            else:
-                msg = "RETRY:主圖縮圖未全部出現，流程中止，暫時性錯誤"
-                log_func(100, msg)
-                await page.close()
-                return False, msg, cf_encountered
+            # 欄位填寫不依賴主圖，縮圖在背景等，按儲存前才確認
+            thumbs_task = asyncio.ensure_future(wait_for_condition(
+                page, COUNT_AT_LEAST_JS, ['#product-images-area img', len(main_images)], timeout=18000
+            ))
         else:
             log_func(12, "⚠️ 沒有主圖可以上傳")
 
         await human_delay()
         await random_mouse_move(page)
 
-        await page.wait_for_selector('input[placeholder="商品名稱是？"]', timeout=browser_timeout*1000)
-        await page.fill('input[placeholder="商品名稱是？"]', name)
-        log_func(22, f"商品名稱已自動填入：{name}")
-
-        await human_delay()
+        stage_timer.mark("fields")
         subtitle_xpath = '//div[@class="basic-item"][div/label[normalize-space()="商品副標題"]]/div/textarea'
-        await page.wait_for_selector(subtitle_xpath, timeout=browser_timeout*1000)
-        await page.fill(subtitle_xpath, subtitle)
-        log_func(25, f"已自動填入商品副標題：{subtitle}")
-
-        await human_delay()
         summary_xpath = '//div[@class="basic-item"][div/label[normalize-space()="商品摘要"]]/div/textarea'
-        await page.wait_for_selector(summary_xpath, timeout=browser_timeout*1000)
-        if summary_html:
-            await page.fill(summary_xpath, summary_html)
-            log_func(28, "以 HTML 模式填入商品摘要")
+        # 極速模式（沒遇到 challenge）時簡單欄位一次填完，失敗的欄位自動改回逐欄填
+        fast_fill = speed_controller is not None and speed_controller.is_speed()
+        if fast_fill:
+            await page.wait_for_selector('input[placeholder="商品名稱是？"]', timeout=browser_timeout*1000)
+            basic_fields = [
+                ('input[placeholder="商品名稱是？"]', name),
+                (subtitle_xpath, subtitle),
+                (summary_xpath, summary_html or ""),
+                ('input[placeholder="自訂義商品網址"]', slug),
+                ('input[placeholder="SEO-Title"]', seo_title),
+                ('textarea[placeholder="SEO-Description"]', seo_description),
+                ('textarea[placeholder="SEO-Keywords"]', seo_keywords),
+            ]
+            filled = await fill_fields_bulk(page, basic_fields, browser_timeout*1000)
+            log_func(33, f"已一次填入名稱、副標題、摘要、網址與SEO（{filled}/{len(basic_fields)} 欄一次到位）")
         else:
-            await page.fill(summary_xpath, "")
-            log_func(28, "已自動填入商品摘要（空）")
+            await page.wait_for_selector('input[placeholder="商品名稱是？"]', timeout=browser_timeout*1000)
+            await page.fill('input[placeholder="商品名稱是？"]', name)
+            log_func(22, f"商品名稱已自動填入：{name}")
 
-        await human_delay()
-        await page.wait_for_selector('input[placeholder="自訂義商品網址"]', timeout=browser_timeout*1000)
-        await page.fill('input[placeholder="自訂義商品網址"]', slug)
-        log_func(30, f"已自動填入商品網址 SLUG：{slug}")
+            await human_delay()
+            await page.wait_for_selector(subtitle_xpath, timeout=browser_timeout*1000)
+            await page.fill(subtitle_xpath, subtitle)
+            log_func(25, f"已自動填入商品副標題：{subtitle}")
 
-        await human_delay()
-        await page.wait_for_selector('input[placeholder="SEO-Title"]', timeout=browser_timeout*1000)
-        await page.fill('input[placeholder="SEO-Title"]', seo_title)
-        await page.wait_for_selector('textarea[placeholder="SEO-Description"]', timeout=browser_timeout*1000)
-        await page.fill('textarea[placeholder="SEO-Description"]', seo_description)
-        await page.wait_for_selector('textarea[placeholder="SEO-Keywords"]', timeout=browser_timeout*1000)
-        await page.fill('textarea[placeholder="SEO-Keywords"]', seo_keywords)
-        log_func(33, f"已自動填入SEO資料")
+            await human_delay()
+            await page.wait_for_selector(summary_xpath, timeout=browser_timeout*1000)
+            if summary_html:
+                await page.fill(summary_xpath, summary_html)
+                log_func(28, "以 HTML 模式填入商品摘要")
+            else:
+                await page.fill(summary_xpath, "")
+                log_func(28, "已自動填入商品摘要（空）")
 
+            await human_delay()
+            await page.wait_for_selector('input[placeholder="自訂義商品網址"]', timeout=browser_timeout*1000)
+            await page.fill('input[placeholder="自訂義商品網址"]', slug)
+            log_func(30, f"已自動填入商品網址 SLUG：{slug}")
+
+            await human_delay()
+            await page.wait_for_selector('input[placeholder="SEO-Title"]', timeout=browser_timeout*1000)
+            await page.fill('input[placeholder="SEO-Title"]', seo_title)
+            await page.wait_for_selector('textarea[placeholder="SEO-Description"]', timeout=browser_timeout*1000)
+            await page.fill('textarea[placeholder="SEO-Description"]', seo_description)
+            await page.wait_for_selector('textarea[placeholder="SEO-Keywords"]', timeout=browser_timeout*1000)
+            await page.fill('textarea[placeholder="SEO-Keywords"]', seo_keywords)
+            log_func(33, f"已自動填入SEO資料")
+
+        stage_timer.mark("specs")
         await human_delay()
         await page.click('#product_size-tab')
         log_func(34, "已切換到商品規格頁籤")
@@ -316,31 +554,50 @@ async def upload_single_product_async(
             await page.wait_for_selector('input[validate-name="price"]', timeout=browser_timeout*1000)
             price_val = info.get("單規格價格", "")
             special_price_val = info.get("單規格特價", "")
-            await page.fill('input[validate-name="price"]', str(price_val) if price_val else "")
-            log_func(36, f"已自動填入售價: {price_val}")
-            await page.fill('input[validate-name="special_price"]', str(special_price_val) if special_price_val else "")
-            log_func(37, f"已自動填入特價: {special_price_val}")
             cost_val = info.get("成本", "")
-            if cost_val:
-                await page.fill('input[validate-name="cost"]', str(cost_val))
-                log_func(38, f"已自動填入成本: {cost_val}")
-            await page.wait_for_selector('input[validate-name="quantity"]', timeout=browser_timeout*1000)
             quantity = info.get("庫存", None)
             if quantity is None or quantity == "":
                 quantity = 0
                 log_func(39, "無庫存資料，自動填 0")
-            await page.fill('input[validate-name="quantity"]', str(quantity))
-            log_func(40, f"已自動填入庫存: {quantity}")
-            try:
-                await page.wait_for_selector('input[validate-name="sku"]', timeout=browser_timeout*1000)
-                sku_val = info.get("商品型號", info.get("貨號", ""))
-                barcode_val = info.get("條碼", "")
-                await page.fill('input[validate-name="sku"]', str(sku_val))
-                log_func(41, f"已自動填入貨號: {sku_val}")
-                await page.fill('input[validate-name="barcode"]', str(barcode_val))
-                log_func(42, f"已自動填入條碼: {barcode_val}")
-            except Exception as e:
-                log_func(42, f"填入貨號或條碼時發生錯誤: {e}")
+            sku_val = info.get("商品型號", info.get("貨號", ""))
+            barcode_val = info.get("條碼", "")
+            if fast_fill:
+                price_fields = [
+                    ('input[validate-name="price"]', str(price_val) if price_val else ""),
+                    ('input[validate-name="special_price"]', str(special_price_val) if special_price_val else ""),
+                    ('input[validate-name="quantity"]', str(quantity)),
+                ]
+                if cost_val:
+                    price_fields.append(('input[validate-name="cost"]', str(cost_val)))
+                filled = await fill_fields_bulk(page, price_fields, browser_timeout*1000)
+                log_func(40, f"已一次填入售價 {price_val}、特價 {special_price_val}、庫存 {quantity}（{filled}/{len(price_fields)} 欄一次到位）")
+                try:
+                    await fill_fields_bulk(page, [
+                        ('input[validate-name="sku"]', str(sku_val)),
+                        ('input[validate-name="barcode"]', str(barcode_val)),
+                    ], browser_timeout*1000)
+                    log_func(42, f"已自動填入貨號: {sku_val}、條碼: {barcode_val}")
+                except Exception as e:
+                    log_func(42, f"填入貨號或條碼時發生錯誤: {e}")
+            else:
+                await page.fill('input[validate-name="price"]', str(price_val) if price_val else "")
+                log_func(36, f"已自動填入售價: {price_val}")
+                await page.fill('input[validate-name="special_price"]', str(special_price_val) if special_price_val else "")
+                log_func(37, f"已自動填入特價: {special_price_val}")
+                if cost_val:
+                    await page.fill('input[validate-name="cost"]', str(cost_val))
+                    log_func(38, f"已自動填入成本: {cost_val}")
+                await page.wait_for_selector('input[validate-name="quantity"]', timeout=browser_timeout*1000)
+                await page.fill('input[validate-name="quantity"]', str(quantity))
+                log_func(40, f"已自動填入庫存: {quantity}")
+                try:
+                    await page.wait_for_selector('input[validate-name="sku"]', timeout=browser_timeout*1000)
+                    await page.fill('input[validate-name="sku"]', str(sku_val))
+                    log_func(41, f"已自動填入貨號: {sku_val}")
+                    await page.fill('input[validate-name="barcode"]', str(barcode_val))
+                    log_func(42, f"已自動填入條碼: {barcode_val}")
+                except Exception as e:
+                    log_func(42, f"填入貨號或條碼時發生錯誤: {e}")
             await page.click('#product_des-tab')
             log_func(43, "已切換到商品描述頁籤")
         else:
@@ -350,7 +607,7 @@ async def upload_single_product_async(
             for i in range(len(spec_types) - 1):
                 await page.locator('button', has_text="新增規格").first.click()
                 log_func(37, f"點擊第 {i+1} 次新增規格")
-                await page.wait_for_timeout(500)
+                await wait_for_condition(page, COUNT_AT_LEAST_JS, ['input[validate-name="options"]', i + 2], timeout=3000)
             for idx, (stype, snames) in enumerate(zip(spec_types, spec_names)):
                 all_type_inputs = await page.query_selector_all('input[validate-name="options"]')
                 if idx < len(all_type_inputs):
@@ -361,11 +618,12 @@ async def upload_single_product_async(
                 name_inputs = await page.query_selector_all(f'.no_{idx} .bootstrap-tagsinput input')
                 if name_inputs:
                     name_input = name_inputs[0]
-                    for sname in snames:
+                    tag_selector = f'.no_{idx} .bootstrap-tagsinput .tag'
+                    for sidx, sname in enumerate(snames):
                         await name_input.fill(sname)
                         await name_input.press("Enter")
                         log_func(39, f"已填入第{idx+1}組規格名稱：{sname}")
-                        await page.wait_for_timeout(150)
+                        await wait_for_condition(page, COUNT_AT_LEAST_JS, [tag_selector, sidx + 1], timeout=2000)
                 else:
                     log_func(39, f"找不到第{idx+1}組規格名稱 input")
             await page.wait_for_selector('.product-format', timeout=browser_timeout*1000)
@@ -414,19 +672,16 @@ async def upload_single_product_async(
         await random_scroll(page)
 
         # === 商品描述 HTML ===
+        stage_timer.mark("description_html")
         desc_iframe_selector = 'iframe#description_ifr'
         max_wait = 10
-        t0 = asyncio.get_event_loop().time()
-        while True:
-            try:
-                await page.wait_for_selector(desc_iframe_selector, timeout=1000, state='visible')
-                break
-            except Exception:
-                if asyncio.get_event_loop().time() - t0 > max_wait:
-                    msg = f"RETRY:TinyMCE 編輯器初始化暫時性失敗：等待元素 {desc_iframe_selector} 超過 {max_wait} 秒，可能卡死/hidden"
-                    log_func(100, msg)
-                    await page.close()
-                    return False, msg, cf_encountered
+        try:
+            await page.wait_for_selector(desc_iframe_selector, timeout=max_wait*1000, state='visible')
+        except Exception:
+            msg = f"RETRY:TinyMCE 編輯器初始化暫時性失敗：等待元素 {desc_iframe_selector} 超過 {max_wait} 秒，可能卡死/hidden"
+            log_func(100, msg)
+            await close_page()
+            return False, msg, cf_encountered
         frame = page.frame(name="description_ifr")
         await frame.wait_for_selector('body', timeout=1500)
         try:
@@ -434,7 +689,7 @@ async def upload_single_product_async(
         except Exception as e:
             msg = f"RETRY:TinyMCE 編輯器初始化暫時性失敗：{e}\n{traceback.format_exc()}"
             log_func(100, msg)
-            await page.close()
+            await close_page()
             return False, msg, cf_encountered
         log_func(50, f"商品描述HTML已填入")
 
@@ -442,8 +697,22 @@ async def upload_single_product_async(
         await random_mouse_move(page)
 
         # === 商品描述插圖 ===
+        stage_timer.mark("description_images")
+        bulk_done = False
+        if desc_images:
+            log_func(70, f"一次上傳描述圖 {len(desc_images)} 張")
+            try:
+                result = await bulk_insert_desc_images(page, desc_images, has_desc_img_spans(desc_html))
+            except Exception as e:
+                result = {"ok": False, "error": str(e)}
+            if result.get("ok"):
+                bulk_done = True
+            else:
+                log_func(70, f"一次上傳描述圖失敗，改用逐張插入：{result.get('error')}")
         try:
-            if has_desc_img_spans(desc_html):
+            if bulk_done:
+                log_func(80, f"描述圖已一次插入 {result.get('count')} 張")
+            elif has_desc_img_spans(desc_html):
                 for idx, img_path in enumerate(desc_images):
                     span_id = f"desc-img-{idx+1}"
                     log_func(70, f"插入描述圖 {idx+1}/{len(desc_images)}，錨點:{span_id}")
@@ -460,20 +729,13 @@ async def upload_single_product_async(
                         }}
                     ''', await frame.query_selector('body'))
                     await page.wait_for_timeout(50)
-                    async with page.expect_file_chooser() as fc_info:
-                        await page.locator('button[aria-label="插入/編輯圖片"],button[title="插入/編輯圖片"]').first.click()
-                        await page.locator('button.tox-browse-url[title="圖片網址"]').click()
-                    file_chooser = await fc_info.value
-                    await file_chooser.set_files(str(Path(img_path)))
-                    await page.wait_for_timeout(400)
-                    await page.locator('div.tox-dialog button.tox-button:has-text("儲存")').click()
+                    await insert_image_via_dialog(page, img_path)
                     await frame.evaluate(f'''
                         body => {{
                             var span = body.querySelector("span#{span_id}");
                             if(span) span.remove();
                         }}
                     ''', await frame.query_selector('body'))
-                    await page.wait_for_timeout(80)
                     log_func(73, f"已插入描述圖 {img_path} 於 {span_id}")
             else:
                 for idx, img_path in enumerate(desc_images):
@@ -484,14 +746,7 @@ async def upload_single_product_async(
                     insert_ok = False
                     for attempt in range(2):  # 最多兩次
                         try:
-                            async with page.expect_file_chooser() as fc_info:
-                                await page.locator('button[aria-label="插入/編輯圖片"],button[title="插入/編輯圖片"]').first.click()
-                                await page.locator('button.tox-browse-url[title="圖片網址"]').click()
-                            file_chooser = await fc_info.value
-                            await file_chooser.set_files(str(Path(img_path)))
-                            await page.wait_for_timeout(400)
-                            await page.locator('div.tox-dialog button.tox-button:has-text("儲存")').click()
-                            await page.wait_for_timeout(150)
+                            await insert_image_via_dialog(page, img_path)
                             insert_ok = True
                             log_func(73, f"描述圖 {img_path} 已插入文末")
                             break
@@ -501,21 +756,32 @@ async def upload_single_product_async(
                             await page.wait_for_timeout(1000)
                     if not insert_ok:
                         raise RuntimeError(f"描述圖 {img_path} 插入失敗")
-                    try:
-                        await page.wait_for_selector('.tox-dialog', state='detached', timeout=5000)
-                    except Exception:
-                        pass
-            log_func(80, "所有描述圖已插入正確位置")
+            if not bulk_done:
+                log_func(80, "所有描述圖已插入正確位置")
         except Exception as e:
             msg = f"FATAL:描述圖片插入失敗：{e}\n{traceback.format_exc()}"
             log_func(100, msg)
-            await page.close()
+            await close_page()
             return False, msg, cf_encountered
 
         await human_delay()
         await random_mouse_move(page)
 
+        # === 確認主圖縮圖都出現了才能儲存 ===
+        stage_timer.mark("thumbnail_wait")
+        if thumbs_task is not None:
+            if not thumbs_task.done():
+                log_func(85, f"等待主圖縮圖顯示（共 {len(main_images)} 張）")
+            if await thumbs_task:
+                log_func(86, "所有主圖縮圖顯示完成")
+            else:
+                msg = "RETRY:主圖縮圖未全部出現，流程中止，暫時性錯誤"
+                log_func(100, msg)
+                await close_page()
+                return False, msg, cf_encountered
+
         # === 儲存 ===
+        stage_timer.mark("save")
         already_saved = False
         try:
             save_btn_xpath = '//div[contains(@class,"all-btn") and contains(@class,"save-btn")]/button'
@@ -523,13 +789,16 @@ async def upload_single_product_async(
             await human_delay()
             await random_mouse_move(page)
             if not already_saved:
+                save_t0 = asyncio.get_event_loop().time()
                 await page.click(save_btn_xpath)
                 already_saved = True
                 log_func(100, "✅ 已自動點擊儲存，等待頁面跳轉判斷是否成功...")
                 try:
                     await page.wait_for_url("https://bvshop-manage.bvshop.tw/product*", timeout=20000)
                     log_func(100, "✅ 儲存成功，已自動跳轉回商品列表頁！")
-                    await page.close()
+                    if speed_controller is not None and not cf_encountered:
+                        speed_controller.record_save(asyncio.get_event_loop().time() - save_t0)
+                    await close_page()
                     return True, "上架成功", cf_encountered
                 except Exception:
                     error_msgs = []
@@ -550,19 +819,19 @@ async def upload_single_product_async(
                     await page.screenshot(path="debug_save_fail.png")
                     await page.screenshot(path="debug_save_full.png", full_page=True)
                     log_func(100, f"❌ 未跳轉回商品列表頁，發現錯誤訊息: {error_msgs}")
-                    await page.close()
+                    await close_page()
                     return False, f"商品儲存失敗, 詳細錯誤請見 debug_save_fail.png, error_msgs: {error_msgs}", cf_encountered
         except Exception as e:
             msg = f"FATAL:儲存商品資料失敗: {e}\n{traceback.format_exc()}"
             log_func(100, msg)
-            await page.close()
+            await close_page()
             return False, msg, cf_encountered
 
     except Exception as e:
         msg = f"FATAL:本輪異常: {e}\n{traceback.format_exc()}"
         log_func(100, msg)
         try:
-            await page.close()
+            await close_page()
         except Exception:
             pass
         return False, msg, cf_encountered